@@ -0,0 +1,104 @@
+"""
+Values-based serialization for the JSON API.
+
+Rows are read with ``values_list`` straight into tuples, without model
+instances, and only the columns of the requested fields (``?fields=``)
+and of the pagination key are selected.
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
+
+
+class InvalidRequest(ValueError):
+    """Malformed query parameters, answered with ``400 Bad Request``."""
+
+
+def image_url(name: str) -> Optional[str]:
+    return default_storage.url(name) if name else None
+
+
+def full_name(first_name: str, last_name: str) -> str:
+    return f'{first_name} {last_name}'.strip()
+
+
+class Field(NamedTuple):
+    columns: tuple
+    # Builds the value from the columns; the only column by default.
+    convert: Optional[Callable] = None
+
+
+POST_FIELDS = {
+    'id': Field(('id',)),
+    'text': Field(('text',)),
+    'pub_date': Field(('pub_date',)),
+    'author': Field(('author__username',)),
+    'author_name': Field(
+        ('author__first_name', 'author__last_name'), full_name
+    ),
+    'group': Field(('group__slug',)),
+    'group_title': Field(('group__title',)),
+    'image': Field(('image',), image_url),
+    'comments_count': Field(('comments_count',)),
+}
+
+COMMENT_FIELDS = {
+    'id': Field(('id',)),
+    'text': Field(('text',)),
+    'pub_date': Field(('pub_date',)),
+    'author': Field(('author__username',)),
+}
+
+
+def parse_fields(value: Optional[str], fields: Dict[str, Field]) -> List[str]:
+    """Field names of a ``fields`` parameter; all of them when empty."""
+    if not value:
+        return list(fields)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise InvalidRequest(f'Unknown fields: {", ".join(unknown)}')
+    return list(dict.fromkeys(names))
+
+
+class Serializer:
+    """
+    Serializes the fields `names` out of `fields`. Their columns are
+    read under `prefix`, e.g. ``post__`` for rows that reference posts,
+    along with the ``(pub_date, tiebreak)`` columns of `key`.
+    """
+
+    def __init__(self, fields: Dict[str, Field], names: Iterable[str],
+                 prefix: str = '', key: tuple = ('pub_date', 'id')):
+        self.columns: List[str] = []
+        self.readers = [
+            (
+                name,
+                [self._index(prefix + column)
+                 for column in fields[name].columns],
+                fields[name].convert,
+            )
+            for name in names
+        ]
+        self.key_indexes = [self._index(column) for column in key]
+
+    def _index(self, column: str) -> int:
+        if column not in self.columns:
+            self.columns.append(column)
+        return self.columns.index(column)
+
+    def rows(self, queryset: QuerySet) -> QuerySet:
+        return queryset.values_list(*self.columns)
+
+    def key(self, row: tuple) -> tuple:
+        return tuple(row[index] for index in self.key_indexes)
+
+    def serialize(self, row: tuple) -> dict:
+        item = {}
+        for name, indexes, convert in self.readers:
+            if convert is None:
+                item[name] = row[indexes[0]]
+            else:
+                item[name] = convert(*(row[index] for index in indexes))
+        return item
@@ -0,0 +1,143 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginator import BACKWARD, encode_cursor
+
+
+class FeedApiTest(TestCase):
+    author: User
+    group: Group
+    post: Post
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой',
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        for i in range(5):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name: str, kwargs=None, **params):
+        return self.client.get(reverse(f'api:{name}', kwargs=kwargs), params)
+
+    def test_cursor_pagination(self):
+        texts, cursor = [], ''
+        while True:
+            response = self.get('posts', limit=2, cursor=cursor)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            page = response.json()
+            texts.extend(post['text'] for post in page['results'])
+            cursor = page['next']
+            if not cursor:
+                break
+
+        self.assertEqual(texts, [f'Пост {i}' for i in range(4, -1, -1)])
+
+    def test_fields(self):
+        page = self.get('posts', fields='id,author,author_name').json()
+
+        self.assertEqual(page['results'][0], {
+            'id': self.post.pk, 'author': 'author',
+            'author_name': 'Лев Толстой',
+        })
+
+    def test_all_fields_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            page = self.get('posts').json()
+
+        self.assertEqual(
+            len([query for query in queries if 'posts_post' in query['sql']]),
+            1,
+        )
+        self.assertEqual(page['results'][0]['comments_count'], 3)
+        self.assertEqual(page['results'][0]['group'], None)
+        self.assertEqual(page['results'][1]['group'], 'group')
+
+    def test_bad_requests(self):
+        backward = encode_cursor(
+            2, BACKWARD, self.post.pub_date, self.post.pk
+        )
+        for params in ({'fields': 'id,password'}, {'limit': '0'},
+                       {'cursor': '!'}, {'cursor': backward}):
+            with self.subTest(params=params):
+                response = self.get('posts', **params)
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+                self.assertIn('detail', response.json())
+
+    def test_group_and_profile(self):
+        group = self.get('group_posts', {'slug': 'group'}).json()
+        profile = self.get('profile_posts', {'username': 'author'}).json()
+
+        self.assertEqual(len(group['results']), 2)
+        self.assertEqual(len(profile['results']), 5)
+        self.assertEqual(
+            self.get('group_posts', {'slug': 'missing'}).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+
+    def test_follow(self):
+        self.assertEqual(
+            self.get('follow').status_code, HTTPStatus.UNAUTHORIZED
+        )
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+
+        response = self.get('follow', fields='text')
+
+        self.assertEqual(response.json()['results'][0], {'text': 'Пост 4'})
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_with_comments(self):
+        page = self.get('post', {'post_id': self.post.pk}).json()
+
+        self.assertEqual(page['post']['text'], 'Пост 4')
+        self.assertEqual(
+            [comment['text'] for comment in page['comments']['results']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0'],
+        )
+        comments = self.get(
+            'comments', {'post_id': self.post.pk}, limit=1
+        ).json()
+        self.assertEqual(len(comments['results']), 1)
+        self.assertTrue(comments['next'])
+        self.assertEqual(
+            self.get('post', {'post_id': 0}).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+
+    def test_cacheable(self):
+        response = self.client.get(
+            reverse('api:posts'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('public', response['Cache-Control'])
+        revalidated = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(revalidated.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        page = self.get('posts', fields='text').json()
+        self.assertEqual(page['results'][0], {'text': 'Новый пост'})
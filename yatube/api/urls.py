@@ -0,0 +1,37 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path(
+        'posts/',
+        views.posts,
+        name='posts',
+    ),
+    path(
+        'posts/<int:post_id>/',
+        views.post,
+        name='post',
+    ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments,
+        name='comments',
+    ),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_posts,
+        name='group_posts',
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts',
+    ),
+    path(
+        'follow/posts/',
+        views.follow,
+        name='follow',
+    ),
+]
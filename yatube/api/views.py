@@ -0,0 +1,221 @@
+"""
+Read-only JSON API mirroring the post feeds and post pages.
+
+Responses are compact JSON, gzipped for clients that accept it, and
+cacheable: they carry the same ``ETag``/``Last-Modified`` validators as
+the HTML pages, anonymous feed pages are kept in the feed cache and the
+public ones may be kept by clients and proxies for ``API_CACHE_MAX_AGE``
+seconds.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from posts import metrics
+from posts.conditional import (
+    Validators, conditional_page, group_page, post_page
+)
+from posts.feed_cache import INDEX_FEED, cache_feed, group_feed, profile_feed
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.paginator import FORWARD, decode_cursor, encode_cursor
+from posts.timeline import heavy_authors
+from posts.views import COMMENTS_PER_PAGE
+from .serializers import (
+    COMMENT_FIELDS, POST_FIELDS, InvalidRequest, Serializer, parse_fields
+)
+
+PAGE_SIZE = getattr(settings, 'API_PAGE_SIZE', 20)
+MAX_PAGE_SIZE = 100
+MAX_AGE = getattr(settings, 'API_CACHE_MAX_AGE', 60)
+# What selects a page of the feed cache for the API.
+PAGE_PARAMS = ('cursor', 'fields', 'limit')
+VIEWS = ('posts', 'group_posts', 'profile_posts', 'follow', 'post',
+         'comments')
+
+metrics.histogram(
+    'api.duration_seconds', 'Time to answer requests to the JSON API.',
+    view=VIEWS,
+)
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(
+        json.dumps(
+            data, cls=DjangoJSONEncoder, ensure_ascii=False,
+            separators=(',', ':'),
+        ),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def api_view(name: str, public: bool = True):
+    """
+    Common decorators of the API views: GET and HEAD only, errors as
+    JSON, gzip, caching headers and the response time metric.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            try:
+                return view(request, *args, **kwargs)
+            except InvalidRequest as error:
+                return json_response({'detail': str(error)}, 400)
+            except Http404:
+                return json_response({'detail': 'Not found.'}, 404)
+
+        caching = (
+            cache_control(public=True, max_age=MAX_AGE) if public
+            else cache_control(private=True)
+        )
+        return gzip_page(caching(metrics.timed(
+            'api.duration_seconds', view=name
+        )(require_safe(wrapper))))
+
+    return decorator
+
+
+def page_size(request: HttpRequest, default: int = PAGE_SIZE) -> int:
+    value = request.GET.get('limit')
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidRequest(f'limit must be from 1 to {MAX_PAGE_SIZE}.')
+    return limit
+
+
+def keyset_page(queryset: QuerySet, serializer: Serializer,
+                cursor: str, limit: int, tiebreak: str = 'pk') -> dict:
+    """
+    A page of rows after `cursor`, newest first, read with a range
+    condition on ``(pub_date, tiebreak)`` like `CursorPaginator`.
+    """
+    queryset = queryset.order_by('-pub_date', f'-{tiebreak}')
+    number = 1
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            raise InvalidRequest('Malformed cursor.')
+        number, direction, pub_date, pk = decoded
+        # The API only pages forward; the HTML pages' previous-page
+        # cursors would be read as next-page ones.
+        if direction != FORWARD:
+            raise InvalidRequest('Only next-page cursors are supported.')
+        queryset = queryset.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, **{f'{tiebreak}__lt': pk})
+        )
+    rows = list(serializer.rows(queryset)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(
+            number + 1, FORWARD, *serializer.key(rows[-1])
+        )
+    return {
+        'results': [serializer.serialize(row) for row in rows],
+        'next': next_cursor,
+    }
+
+
+def posts_page(request: HttpRequest, posts: QuerySet) -> HttpResponse:
+    serializer = Serializer(
+        POST_FIELDS, parse_fields(request.GET.get('fields'), POST_FIELDS)
+    )
+    return json_response(keyset_page(
+        posts, serializer, request.GET.get('cursor'), page_size(request)
+    ))
+
+
+@api_view('posts')
+@conditional_page(lambda: Validators([INDEX_FEED]))
+@cache_feed(lambda: INDEX_FEED, PAGE_PARAMS)
+def posts(request: HttpRequest) -> HttpResponse:
+    return posts_page(request, Post.objects.all())
+
+
+@api_view('group_posts')
+@conditional_page(group_page)
+@cache_feed(group_feed, PAGE_PARAMS)
+def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return posts_page(request, Post.objects.filter(group_id=group.pk))
+
+
+@api_view('profile_posts')
+@conditional_page(lambda username: Validators([profile_feed(username)]))
+@cache_feed(profile_feed, PAGE_PARAMS)
+def profile_posts(request: HttpRequest, username: str) -> HttpResponse:
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return posts_page(request, Post.objects.filter(author_id=author.pk))
+
+
+@api_view('follow', public=False)
+def follow(request: HttpRequest) -> HttpResponse:
+    """The subscription feed of the user, read like `timeline_page`."""
+    user = request.user
+    if not user.is_authenticated:
+        return json_response({'detail': 'Authentication required.'}, 401)
+    heavy = heavy_authors(user)
+    if heavy:
+        return posts_page(request, Post.objects.filter(
+            Q(pk__in=TimelineEntry.objects.filter(
+                user=user
+            ).values('post_id'))
+            | Q(author__in=heavy)
+        ))
+
+    serializer = Serializer(
+        POST_FIELDS, parse_fields(request.GET.get('fields'), POST_FIELDS),
+        prefix='post__', key=('pub_date', 'post_id'),
+    )
+    return json_response(keyset_page(
+        TimelineEntry.objects.filter(user=user), serializer,
+        request.GET.get('cursor'), page_size(request), tiebreak='post_id',
+    ))
+
+
+def comments_page(post_id: int, cursor: str, limit: int) -> dict:
+    return keyset_page(
+        Comment.objects.filter(post_id=post_id),
+        Serializer(COMMENT_FIELDS, COMMENT_FIELDS), cursor, limit,
+    )
+
+
+@api_view('post')
+@conditional_page(post_page)
+def post(request: HttpRequest, post_id: int) -> HttpResponse:
+    """The post with the first page of its comments."""
+    serializer = Serializer(
+        POST_FIELDS, parse_fields(request.GET.get('fields'), POST_FIELDS)
+    )
+    row = serializer.rows(Post.objects.filter(pk=post_id)).first()
+    if row is None:
+        raise Http404
+    return json_response({
+        'post': serializer.serialize(row),
+        'comments': comments_page(post_id, '', COMMENTS_PER_PAGE),
+    })
+
+
+@api_view('comments')
+@conditional_page(post_page)
+def comments(request: HttpRequest, post_id: int) -> HttpResponse:
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return json_response(comments_page(
+        post_id, request.GET.get('cursor'),
+        page_size(request, COMMENTS_PER_PAGE),
+    ))
@@ -0,0 +1,126 @@
+"""
+ASGI adapter for the WSGI application.
+
+Django 2.2 has no async views and no ASGI handler. This adapter lets an
+ASGI server (uvicorn, daphne, hypercorn) host the project anyway: the
+request body is received and the response sent on the event loop, and
+only the Django view itself runs in a bounded thread pool. A slow client
+or a large upload no longer holds a worker thread while bytes trickle
+in or out.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+# Bodies larger than this are spooled to disk while being received.
+SPOOL_SIZE = 1024 * 1024
+
+
+def _environ(scope: dict, body) -> dict:
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI carries the raw bytes of the path as latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # HTTP/2 clients send every cookie in a header of its own.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class WSGIToASGI:
+    """Serves `wsgi_application` over ASGI with at most `threads` views."""
+
+    def __init__(self, wsgi_application: Callable, threads: int):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope {scope["type"]!r}')
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope: dict, receive, send) -> None:
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body', False):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            status, headers, content = await loop.run_in_executor(
+                self.executor, self.run_view, _environ(scope, body)
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        for chunk in content:
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def run_view(self, environ: dict) -> Tuple[int, list, List[bytes]]:
+        """Calls the WSGI application in a pool thread."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            content = [chunk for chunk in result if chunk]
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
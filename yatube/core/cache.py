@@ -0,0 +1,275 @@
+"""
+Cache backend shared by all worker processes of a host.
+
+Entries are kept in one SQLite file, so a page cached by one worker is
+served by the others, and an invalidation done by one worker is seen by
+all of them. The file is capped at ``OPTIONS['MAX_SIZE']`` bytes of keys
+and values; past the cap, expired entries and then the least recently
+read ones are evicted. ``MAX_SIZE: None`` lifts the cap, for data that
+must never be evicted.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_SIZE': 64 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+# Eviction frees space down to this share of the cap.
+CULL_TO = 0.9
+# Reads refresh the LRU position at most once per this many seconds.
+TOUCH_INTERVAL = 1.0
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed '
+    'ON cache_entry (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' total INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_size VALUES (0, 0)',
+    # The running total keeps the size check O(1).
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_insert '
+    'AFTER INSERT ON cache_entry BEGIN '
+    'UPDATE cache_size SET total = total + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_delete '
+    'AFTER DELETE ON cache_entry BEGIN '
+    'UPDATE cache_size SET total = total - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_update '
+    'AFTER UPDATE OF size ON cache_entry BEGIN '
+    'UPDATE cache_size SET total = total - old.size + new.size; END',
+)
+
+UPSERT = (
+    'INSERT INTO cache_entry (key, value, expires, accessed, size) '
+    'VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+    'expires = excluded.expires, accessed = excluded.accessed, '
+    'size = excluded.size'
+)
+
+
+def _expired(expires, now: float) -> bool:
+    return expires is not None and expires <= now
+
+
+class SQLiteCache(BaseCache):
+    """Cross-process LRU cache in a SQLite file at `location`."""
+
+    def __init__(self, location: str, params: dict):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        max_size = options.get('MAX_SIZE', DEFAULT_MAX_SIZE)
+        self._max_size = None if max_size is None else int(max_size)
+        self._local = threading.local()
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread, opened again in forked workers.
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self._path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with self._transaction(db):
+                for statement in SCHEMA:
+                    db.execute(statement)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self, db: sqlite3.Connection = None):
+        db = db or self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version=None) -> str:
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key: str, value, timeout, now: float) -> tuple:
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return (key, blob, self.get_backend_timeout(timeout), now,
+                len(key) + len(blob))
+
+    def _cull(self, db: sqlite3.Connection, now: float) -> None:
+        if self._max_size is None:
+            return
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        if total <= self._max_size:
+            return
+        db.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (now,)
+        )
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        excess = total - int(self._max_size * CULL_TO)
+        if excess > 0:
+            db.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                ' SELECT key FROM ('
+                '  SELECT key, SUM(size) OVER ('
+                '   ORDER BY accessed ROWS UNBOUNDED PRECEDING'
+                '  ) - size AS freed FROM cache_entry'
+                ' ) WHERE freed < ?)',
+                (excess,),
+            )
+
+    def get_many(self, keys, version=None) -> dict:
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        db = self._db()
+        rows = db.execute(
+            'SELECT key, value, expires, accessed FROM cache_entry '
+            'WHERE key IN ({})'.format(', '.join('?' * len(keys))),
+            list(keys),
+        ).fetchall()
+        found, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if _expired(expires, now):
+                continue
+            found[keys[key]] = pickle.loads(value)
+            if accessed < now - TOUCH_INTERVAL:
+                stale.append((now, key))
+        if stale:
+            db.executemany(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?', stale
+            )
+        return found
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None) -> list:
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(UPSERT, rows)
+            self._cull(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                UPSERT + ' WHERE cache_entry.expires <= ?',
+                self._row(self._key(key, version), value, timeout, now)
+                + (now,),
+            )
+            added = cursor.rowcount > 0
+            if added:
+                self._cull(db, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None or _expired(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (blob, len(key) + len(blob), now, key),
+            )
+        return value
+
+    def incr_many(self, deltas: dict, version=None) -> None:
+        """
+        Adds every delta to its key in one transaction. Missing keys start
+        from zero and never expire.
+        """
+        now = time.time()
+        rows = []
+        with self._transaction() as db:
+            for key, delta in deltas.items():
+                key = self._key(key, version)
+                row = db.execute(
+                    'SELECT value, expires FROM cache_entry WHERE key = ?',
+                    (key,),
+                ).fetchone()
+                if row is not None and not _expired(row[1], now):
+                    delta += pickle.loads(row[0])
+                rows.append(self._row(key, delta, None, now))
+            db.executemany(UPSERT, rows)
+            self._cull(db, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                'UPDATE cache_entry SET expires = ?, accessed = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now,
+                 self._key(key, version), now),
+            )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None) -> bool:
+        row = self._db().execute(
+            'SELECT expires FROM cache_entry WHERE key = ?',
+            (self._key(key, version),),
+        ).fetchone()
+        return row is not None and not _expired(row[0], time.time())
+
+    def delete(self, key, version=None) -> bool:
+        cursor = self._db().execute(
+            'DELETE FROM cache_entry WHERE key = ?',
+            (self._key(key, version),),
+        )
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None) -> None:
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction() as db:
+            db.executemany(
+                'DELETE FROM cache_entry WHERE key = ?',
+                [(key,) for key in keys],
+            )
+
+    def clear(self) -> None:
+        self._db().execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs) -> None:
+        # Django closes caches after every request; the connection is
+        # kept open for the next one.
+        pass
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.cache import get_cache_key, learn_cache_key
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'shared': 'core.cache.SQLiteCache',
+}
+KEY_PREFIX = 'benchmark'
+TIMEOUT = 60
+PAYLOAD = 'x' * 20 * 1024
+
+
+def worker(backend: str, location: str, seed: int, requests: int,
+           pages: int) -> tuple:
+    """Serves page requests through the cache like ``cache_page`` does."""
+    cache = import_string(BACKENDS[backend])(location, {})
+    factory = RequestFactory()
+    rng = random.Random(seed)
+    # Popular pages are requested more often, as on a real site.
+    weights = [1 / (page + 1) for page in range(pages)]
+    hits = 0
+    for page in rng.choices(range(pages), weights, k=requests):
+        request = factory.get('/', {'page': page})
+        key = get_cache_key(request, KEY_PREFIX, 'GET', cache=cache)
+        if key is not None and cache.get(key) is not None:
+            hits += 1
+            continue
+        response = HttpResponse(PAYLOAD)
+        key = learn_cache_key(request, response, TIMEOUT, KEY_PREFIX, cache)
+        cache.set(key, response, TIMEOUT)
+    return hits, requests
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий в кеш страниц при нескольких рабочих '
+        'процессах для локального и общего бэкендов кеша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число рабочих процессов.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Число запросов на один процесс.',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=200,
+            help='Число различных страниц.',
+        )
+        parser.add_argument(
+            '--backend', choices=sorted(BACKENDS), action='append',
+            help='Проверяемый бэкенд; по умолчанию все.',
+        )
+
+    def run(self, backend: str, options: dict) -> tuple:
+        with tempfile.TemporaryDirectory() as directory:
+            location = os.path.join(directory, 'cache.sqlite3')
+            jobs = [
+                (backend, location, seed, options['requests'],
+                 options['pages'])
+                for seed in range(options['workers'])
+            ]
+            context = multiprocessing.get_context('fork')
+            started = time.monotonic()
+            with context.Pool(options['workers']) as pool:
+                results = pool.starmap(worker, jobs)
+            elapsed = time.monotonic() - started
+        hits = sum(hits for hits, _ in results)
+        total = sum(requests for _, requests in results)
+        return hits / total, total / elapsed
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{options["workers"]} workers x {options["requests"]} requests '
+            f'over {options["pages"]} pages'
+        )
+        for backend in options['backend'] or sorted(BACKENDS):
+            hit_rate, throughput = self.run(backend, options)
+            self.stdout.write(
+                f'{backend:>8}: hit rate {hit_rate:.1%}, '
+                f'{throughput:.0f} req/s'
+            )
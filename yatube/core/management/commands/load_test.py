@@ -0,0 +1,148 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.percentiles import PERCENTILES, percentiles
+
+
+class LoadTest:
+    """Sends GET requests to one URL from `concurrency` clients at once."""
+
+    def __init__(self, url: str, requests: int, concurrency: int,
+                 slow_clients: int, slow_delay: float):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'Ожидается адрес вида http://host/: {url}')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        self.request = (
+            f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode()
+        self.requests = requests
+        self.concurrency = concurrency
+        self.slow_clients = slow_clients
+        self.slow_delay = slow_delay
+        self.latencies = []
+        self.errors = 0
+
+    async def fetch(self) -> None:
+        started = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            writer.write(self.request)
+            status_line = await reader.readline()
+            await reader.read()
+            writer.close()
+        except OSError:
+            self.errors += 1
+            return
+        if status_line.split(b' ')[1:2] != [b'200']:
+            self.errors += 1
+            return
+        self.latencies.append(time.monotonic() - started)
+
+    async def client(self, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+            await self.fetch()
+
+    async def slow_client(self, done: asyncio.Event) -> None:
+        """Holds a connection open by sending the request byte by byte."""
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            for byte in self.request[:-1]:
+                if done.is_set():
+                    break
+                writer.write(bytes([byte]))
+                await asyncio.sleep(self.slow_delay)
+            writer.close()
+        except OSError:
+            pass
+
+    async def run(self) -> float:
+        queue = asyncio.Queue()
+        for _ in range(self.requests):
+            queue.put_nowait(None)
+        done = asyncio.Event()
+        slow = [
+            asyncio.ensure_future(self.slow_client(done))
+            for _ in range(self.slow_clients)
+        ]
+        # Let the slow clients occupy their connections first.
+        await asyncio.sleep(self.slow_delay)
+        started = time.monotonic()
+        await asyncio.gather(
+            *(self.client(queue) for _ in range(self.concurrency))
+        )
+        elapsed = time.monotonic() - started
+        done.set()
+        await asyncio.gather(*slow)
+        return elapsed
+
+    def report(self, elapsed: float) -> dict:
+        result = {
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'rps': len(self.latencies) / elapsed if elapsed else 0.0,
+        }
+        if self.latencies:
+            for percentile, value in percentiles(self.latencies).items():
+                result[f'p{percentile}'] = value * 1000
+        return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест страницы: число запросов в секунду и задержки '
+        'p50/p95/p99. Запустите проект под WSGI-сервером '
+        '(gunicorn yatube.wsgi) и под ASGI-сервером '
+        '(uvicorn yatube.asgi:application) и сравните результаты, '
+        'в том числе с медленными клиентами (--slow-clients).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='+', help='Адреса для сравнения.')
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Число запросов к каждому адресу.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=20,
+            help='Число одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Число клиентов, медленно отправляющих запрос.',
+        )
+        parser.add_argument(
+            '--slow-delay', type=float, default=0.1,
+            help='Пауза между байтами медленного клиента, в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        for url in options['url']:
+            test = LoadTest(
+                url, options['requests'], options['concurrency'],
+                options['slow_clients'], options['slow_delay'],
+            )
+            result = test.report(asyncio.run(test.run()))
+            line = (
+                f'{url}: {result["rps"]:.0f} req/s, '
+                f'{result["requests"]} ok, {result["errors"]} errors'
+            )
+            if 'p50' in result:
+                line += ', ' + ', '.join(
+                    f'p{percentile} {result[f"p{percentile}"]:.1f} ms'
+                    for percentile in PERCENTILES
+                )
+            self.stdout.write(line)
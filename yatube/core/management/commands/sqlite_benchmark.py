@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.signals import apply_pragmas
+
+ROWS = 10_000
+PAGE = 10
+
+
+class Connections:
+    """A connection per request, or one kept open like ``CONN_MAX_AGE``."""
+
+    def __init__(self, path: str, pragmas: dict, persistent: bool):
+        self.path, self.pragmas, self.persistent = path, pragmas, persistent
+        self.db = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.db = sqlite3.connect(self.path)
+            apply_pragmas(self.db.cursor(), self.pragmas)
+        return self.db
+
+    def __exit__(self, *exc_info):
+        if not self.persistent:
+            self.db.close()
+            self.db = None
+
+
+def seed(path: str) -> None:
+    with sqlite3.connect(path) as db:
+        db.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+            'pub_date REAL)'
+        )
+        db.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+        db.executemany(
+            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+            ((f'Пост {i} ' * 20, i) for i in range(ROWS)),
+        )
+
+
+def worker(path: str, pragmas: dict, persistent: bool, writer: bool,
+           duration: float, seed_value: int) -> tuple:
+    """Serves feed reads or post writes for `duration` seconds."""
+    rng = random.Random(seed_value)
+    connections = Connections(path, pragmas, persistent)
+    done = locked = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            with connections as db:
+                if writer:
+                    with db:
+                        db.execute(
+                            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+                            ('Новый пост ' * 20, time.time()),
+                        )
+                else:
+                    db.execute(
+                        'SELECT id, text FROM post ORDER BY pub_date DESC '
+                        'LIMIT ? OFFSET ?',
+                        (PAGE, rng.randrange(ROWS // PAGE) * PAGE),
+                    ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            locked += 1
+    return writer, done, locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при одновременных '
+        'чтениях и записях в обычном и производственном режимах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Число читающих процессов.',
+        )
+        parser.add_argument(
+            '--writers', type=int, default=1,
+            help='Число пишущих процессов.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность каждого прогона в секундах.',
+        )
+
+    def run(self, pragmas: dict, persistent: bool, options: dict) -> dict:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            seed(path)
+            roles = [False] * options['readers'] + [True] * options['writers']
+            jobs = [
+                (path, pragmas, persistent, writer, options['duration'], i)
+                for i, writer in enumerate(roles)
+            ]
+            context = multiprocessing.get_context('fork')
+            with context.Pool(len(jobs)) as pool:
+                results = pool.starmap(worker, jobs)
+        totals = {'reads': 0, 'writes': 0, 'locked': 0}
+        for writer, done, locked in results:
+            totals['writes' if writer else 'reads'] += done
+            totals['locked'] += locked
+        return totals
+
+    def handle(self, *args, **options):
+        modes = {
+            'default': ({}, False),
+            'production': (settings.SQLITE_PRODUCTION_PRAGMAS, True),
+        }
+        self.stdout.write(
+            f'{options["readers"]} readers, {options["writers"]} writers, '
+            f'{options["duration"]:g}s per mode'
+        )
+        for mode, (pragmas, persistent) in modes.items():
+            totals = self.run(pragmas, persistent, options)
+            self.stdout.write(
+                f'{mode:>10}: '
+                f'{totals["reads"] / options["duration"]:.0f} reads/s, '
+                f'{totals["writes"] / options["duration"]:.0f} writes/s, '
+                f'{totals["locked"]} locked'
+            )
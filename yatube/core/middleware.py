@@ -0,0 +1,101 @@
+import random
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from . import profiling, queries
+from .routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_db'
+
+
+class ReplicaMiddleware:
+    """
+    Serves read-only requests from the replicas. A write pins the user
+    to the primary for ``REPLICA_PIN_SECONDS``, long enough for the
+    replicas to catch up, so that the redirect after a new post or
+    comment already shows it. Views that write on a GET (following an
+    author) are marked with `writes_to_primary`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            return self.get_response(request)
+
+        writes = request.method not in SAFE_METHODS
+        with replica_reads(not writes and PIN_COOKIE not in request.COOKIES):
+            response = self.get_response(request)
+        if writes or getattr(request, 'writes_to_primary', False):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def writes_to_primary(view):
+    """
+    Marks a view that writes even on a GET: it reads from the primary
+    and pins the user to it like any other write.
+    """
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        request.writes_to_primary = True
+        with replica_reads(False):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a ``PROFILING_SAMPLE_RATE`` share of requests (none by
+    default): SQL, template and Python time go to the ``Server-Timing``
+    header and, with the per-template times and cache and thumbnail
+    counters, to a JSON line of the ``core.profiling`` logger.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        profiling.instrument_templates()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+
+        with profiling.profile() as profile:
+            response = self.get_response(request)
+        response['Server-Timing'] = profile.server_timing()
+        profiling.log(request, response, profile)
+        return response
+
+
+class QueryInspectionMiddleware:
+    """
+    With ``QUERY_INSPECTION`` set to ``'log'`` (development, staging),
+    logs the slow and repeated (N+1) queries of every request, see
+    `core.queries`. ``'raise'`` fails the request with `QueryProblem`
+    instead, for tests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        mode = getattr(settings, 'QUERY_INSPECTION', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        with queries.inspect_queries() as inspection:
+            response = self.get_response(request)
+        problems = queries.report(request, inspection, log=mode == 'log')
+        if problems and mode == 'raise':
+            raise queries.QueryProblem('\n'.join(problems))
+        return response
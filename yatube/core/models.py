@@ -1,4 +1,43 @@
-from django.db import models
+from django.db import models, transaction
+
+
+class AtomicSaveModel(models.Model):
+    """
+    Абстрактная модель. Сохраняет запись вместе с обработчиками
+    сигнала post_save в одной транзакции.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class CounterFieldsModel(models.Model):
+    """
+    Абстрактная модель. Поля из COUNTER_FIELDS меняются только
+    выражениями F(), поэтому обычное сохранение существующей записи их
+    не записывает: иначе параллельный инкремент затёрся бы старым
+    значением.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
 
 
 class CreatedModel(models.Model):
@@ -11,3 +50,53 @@ class CreatedModel(models.Model):
     class Meta:
         abstract = True
         ordering = ('-pub_date',)
+
+
+class VersionedModel(models.Model):
+    """
+    Абстрактная модель. Хранит дату последнего изменения и номер версии,
+    который увеличивается при каждом сохранении существующей записи.
+    По ним строятся ключи кеша и валидаторы ETag/Last-Modified.
+    """
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+    )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            update_fields is not None and not update_fields
+        ):
+            super().save(*args, **kwargs)
+            return
+        deferred = self.get_deferred_fields()
+        if update_fields is None and deferred:
+            # Django would save the loaded fields only, without modified.
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
+        # Concurrent edits must not end up with the same version.
+        self.version = models.F('version') + 1
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'modified', 'version'}
+        super().save(*args, **kwargs)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False,
+                    force_update=False, using=None, update_fields=None):
+        updated = super()._save_table(
+            raw, cls, force_insert, force_update, using, update_fields
+        )
+        # Before post_save is sent, so receivers see the number.
+        if isinstance(self.version, models.expressions.Combinable):
+            self.refresh_from_db(using=using, fields=['version'])
+        return updated
+
+    class Meta:
+        abstract = True
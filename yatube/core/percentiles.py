@@ -0,0 +1,26 @@
+"""
+Latency percentiles for the load and benchmark commands, without
+``statistics.quantiles`` (Python 3.8+).
+"""
+from typing import Dict, Iterable, Sequence
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(values: Sequence[float],
+                points: Iterable[int] = PERCENTILES) -> Dict[int, float]:
+    """
+    Percentiles of non-empty `values`, interpolated between the closest
+    ranks like ``statistics.quantiles(method='inclusive')``.
+    """
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    result = {}
+    for point in points:
+        position = last * point / 100
+        lower = int(position)
+        upper = min(lower + 1, last)
+        result[point] = ordered[lower] + (
+            ordered[upper] - ordered[lower]
+        ) * (position - lower)
+    return result
@@ -0,0 +1,206 @@
+"""
+Per-request profiling.
+
+A profiled request records its SQL queries, the render time of every
+template, the hits and misses of the default cache and any counters the
+code adds with `count` (such as thumbnail lookups). Template time leaves
+out the queries run while rendering, so SQL, templates and the rest of
+the Python code add up to the total. See `ProfilingMiddleware`.
+"""
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_profile = ContextVar('profile', default=None)
+_MISSING = object()
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        # Queries run while a template renders, taken out of its time.
+        self.template_sql_time = 0.0
+        self.template_time = 0.0
+        self.templates = defaultdict(float)
+        self.template_depth = 0
+        self.cache_depth = 0
+        self.counters = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        """Database ``execute_wrapper`` timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += elapsed
+            if self.template_depth:
+                self.template_sql_time += elapsed
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self.started
+
+    def timings(self) -> dict:
+        """Milliseconds spent in SQL, templates and the rest."""
+        template = self.template_time - self.template_sql_time
+        return {
+            'total': self.total * 1000,
+            'sql': self.sql_time * 1000,
+            'template': template * 1000,
+            'python': (self.total - self.sql_time - template) * 1000,
+        }
+
+    def server_timing(self) -> str:
+        timings = self.timings()
+        return ', '.join([
+            f'sql;dur={timings["sql"]:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={timings["template"]:.1f}',
+            f'app;dur={timings["python"]:.1f}',
+            f'total;dur={timings["total"]:.1f}',
+            'cache;desc="hits={} misses={}"'.format(
+                self.counters['cache.hits'], self.counters['cache.misses']
+            ),
+            'thumb;desc="lookups={} misses={}"'.format(
+                self.counters['thumbnails.lookups'],
+                self.counters['thumbnails.misses'],
+            ),
+        ])
+
+    def record(self) -> dict:
+        return {
+            **{
+                f'{name}_ms': round(value, 2)
+                for name, value in self.timings().items()
+            },
+            'sql_count': self.sql_count,
+            'templates': {
+                name: round(seconds * 1000, 2)
+                for name, seconds in sorted(
+                    self.templates.items(), key=lambda item: -item[1]
+                )
+            },
+            'counters': dict(self.counters),
+        }
+
+
+def current() -> Optional[Profile]:
+    return _profile.get()
+
+
+def count(name: str, delta: int = 1) -> None:
+    """Adds to a counter of the request being profiled, if any."""
+    profile = _profile.get()
+    if profile is not None:
+        profile.counters[name] += delta
+
+
+def instrument_templates() -> None:
+    """Times ``Template`` rendering while a request is profiled."""
+    render = Template._render
+    if getattr(render, 'profiled', False):
+        return
+
+    def profiled_render(template, context):
+        profile = _profile.get()
+        if profile is None:
+            return render(template, context)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile.template_depth -= 1
+            name = template.origin.template_name or template.name or '<str>'
+            profile.templates[name] += elapsed
+            # Included templates are already in the time of the outer one.
+            if not profile.template_depth:
+                profile.template_time += elapsed
+
+    profiled_render.profiled = True
+    Template._render = profiled_render
+
+
+def _counted(profile: Profile, hits: int, misses: int) -> None:
+    profile.counters['cache.hits'] += hits
+    profile.counters['cache.misses'] += misses
+
+
+def instrument_cache(backend) -> None:
+    """Counts the hits and misses of reads from a cache backend."""
+    if getattr(backend, '_profiled', False):
+        return
+    get, get_many = backend.get, backend.get_many
+
+    def profiled_get(key, default=None, version=None):
+        profile = _profile.get()
+        if profile is None or profile.cache_depth:
+            return get(key, default, version)
+        profile.cache_depth += 1
+        try:
+            value = get(key, _MISSING, version)
+        finally:
+            profile.cache_depth -= 1
+        _counted(profile, value is not _MISSING, value is _MISSING)
+        return default if value is _MISSING else value
+
+    def profiled_get_many(keys, version=None):
+        profile = _profile.get()
+        if profile is None or profile.cache_depth:
+            return get_many(keys, version)
+        keys = list(keys)
+        # Backends build one operation on the other: count it once.
+        profile.cache_depth += 1
+        try:
+            values = get_many(keys, version)
+        finally:
+            profile.cache_depth -= 1
+        _counted(profile, len(values), len(keys) - len(values))
+        return values
+
+    backend.get, backend.get_many = profiled_get, profiled_get_many
+    backend._profiled = True
+
+
+@contextmanager
+def profile():
+    """Profiles the code in the block; yields the `Profile`."""
+    current_profile = Profile()
+    instrument_cache(caches['default'])
+    token = _profile.set(current_profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(current_profile.execute)
+                )
+            yield current_profile
+    finally:
+        _profile.reset(token)
+        current_profile.finish()
+
+
+def log(request, response, current_profile: Profile) -> None:
+    """Writes the profile of a request as one JSON log line."""
+    match = request.resolver_match
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        **current_profile.record(),
+    }, ensure_ascii=False))
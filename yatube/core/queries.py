@@ -0,0 +1,218 @@
+"""
+Slow query log and N+1 detection, for development and staging.
+
+While a request is inspected every query is recorded with where it came
+from: the first frame of the project code and, for queries run while a
+template renders, the template line. Queries slower than
+``SLOW_QUERY_MS`` and query shapes (the SQL with its values left out)
+run ``N_PLUS_ONE_THRESHOLD`` times or more, the mark of a loop loading
+one row at a time, are logged to ``core.queries`` and summed up per view
+(see `reports`). See `QueryInspectionMiddleware`.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+# The standard library and the installed packages, Django included.
+_LIBRARIES = (
+    os.path.dirname(os.__file__),
+    os.path.dirname(os.path.dirname(django.__file__)),
+)
+# Wrappers around the code that runs queries.
+_WRAPPERS = {__file__, profiling.__file__}
+_RENDER = Node.render_annotated.__code__
+
+
+class QueryProblem(Exception):
+    """Slow or repeated queries, with ``QUERY_INSPECTION = 'raise'``."""
+
+
+class Query(NamedTuple):
+    sql: str
+    shape: str
+    duration: float
+    origin: Optional[str]
+    template: Optional[str]
+
+    def places(self) -> str:
+        places = ', '.join(filter(None, (self.origin, self.template)))
+        return places or 'unknown origin'
+
+    def describe(self) -> str:
+        return f'{self.sql} ({self.places()})'
+
+
+def shape(sql: str) -> str:
+    """The query with its values and the length of ``IN`` lists left out."""
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _origin() -> tuple:
+    """``path:line`` of the project code and the template running a query."""
+    code, template = None, None
+    frame = sys._getframe(2)
+    while frame is not None and (code is None or template is None):
+        filename = frame.f_code.co_filename
+        if template is None and frame.f_code is _RENDER:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                name = origin.template_name or origin.name
+                template = f'{name}:{token.lineno}'
+        elif (code is None and filename.startswith(settings.BASE_DIR)
+              and not filename.startswith(_LIBRARIES)
+              and filename not in _WRAPPERS):
+            relative = os.path.relpath(filename, settings.BASE_DIR)
+            code = f'{relative}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code, template
+
+
+class Inspection:
+    def __init__(self, slow_ms: float, repeats: int):
+        self.slow_ms = slow_ms
+        self.repeats = repeats
+        self.queries: List[Query] = []
+
+    def execute(self, execute, sql, params, many, context):
+        """Database ``execute_wrapper`` recording every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries.append(
+                Query(sql, shape(sql), duration, *_origin())
+            )
+
+    def slow(self) -> List[Query]:
+        return [
+            query for query in self.queries
+            if query.duration * 1000 >= self.slow_ms
+        ]
+
+    def repeated(self) -> Dict[str, List[Query]]:
+        """Queries of every shape run at least ``repeats`` times."""
+        shapes = defaultdict(list)
+        for query in self.queries:
+            shapes[query.shape].append(query)
+        return {
+            query_shape: queries for query_shape, queries in shapes.items()
+            if len(queries) >= self.repeats
+        }
+
+    def problems(self) -> List[str]:
+        problems = [
+            f'slow query, {query.duration * 1000:.1f} ms: '
+            f'{query.describe()}'
+            for query in self.slow()
+        ]
+        problems.extend(
+            f'N+1, {len(queries)} queries: {queries[0].describe()}'
+            for queries in self.repeated().values()
+        )
+        return problems
+
+
+@contextmanager
+def inspect_queries(slow_ms: Optional[float] = None,
+                    repeats: Optional[int] = None):
+    """Records the queries of the block; yields the `Inspection`."""
+    inspection = Inspection(
+        getattr(settings, 'SLOW_QUERY_MS', 100) if slow_ms is None
+        else slow_ms,
+        getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5) if repeats is None
+        else repeats,
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(inspection.execute)
+            )
+        yield inspection
+
+
+class ViewReport:
+    """Problems found in the requests to one view."""
+
+    def __init__(self):
+        self.requests = 0
+        self.slow = 0
+        self.slowest_ms = 0.0
+        # Shape: (requests it was repeated in, most repeats, origin).
+        self.repeated = {}
+
+    def add(self, inspection: Inspection) -> None:
+        self.requests += 1
+        for query in inspection.slow():
+            self.slow += 1
+            self.slowest_ms = max(self.slowest_ms, query.duration * 1000)
+        for query_shape, queries in inspection.repeated().items():
+            requests, most, _ = self.repeated.get(query_shape, (0, 0, None))
+            self.repeated[query_shape] = (
+                requests + 1, max(most, len(queries)), queries[0].places(),
+            )
+
+    def as_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'slow_queries': self.slow,
+            'slowest_ms': round(self.slowest_ms, 2),
+            'n_plus_one': [
+                {'shape': query_shape, 'requests': requests,
+                 'max_repeats': most, 'origin': origin}
+                for query_shape, (requests, most, origin)
+                in self.repeated.items()
+            ],
+        }
+
+
+_reports: Dict[str, ViewReport] = defaultdict(ViewReport)
+# One report for all requests that no URL pattern matched, whatever the
+# path: keyed on paths, the reports would grow with every 404.
+UNRESOLVED = '<unresolved>'
+
+
+def reports() -> Dict[str, dict]:
+    """Requests inspected so far in this process, per view name."""
+    return {view: report.as_dict() for view, report in _reports.items()}
+
+
+def report(request, inspection: Inspection, log: bool = True) -> List[str]:
+    """Adds a request to its view report and logs its problems."""
+    match = request.resolver_match
+    view = match.view_name if match else UNRESOLVED
+    problems = inspection.problems()
+    _reports[view].add(inspection)
+    if problems and log:
+        logger.warning(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'queries': len(inspection.queries),
+            'problems': problems,
+        }, ensure_ascii=False))
+    return problems
@@ -0,0 +1,43 @@
+"""
+Routing of reads to database replicas.
+
+Reads go to the aliases listed in ``DATABASE_REPLICAS`` only while a
+read-only request is served (see `ReplicaMiddleware`). Writes, reads in
+a transaction, management commands and the requests of a user who has
+just written something use the primary, so that users see their own
+writes even when the replicas lag behind.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replicas_allowed = ContextVar('replicas_allowed', default=False)
+
+
+@contextmanager
+def replica_reads(allowed: bool = True):
+    """Lets the reads inside the block go to the replicas."""
+    token = _replicas_allowed.set(allowed)
+    try:
+        yield
+    finally:
+        _replicas_allowed.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> str:
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if (not replicas or not _replicas_allowed.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same rows as the primary.
+        return True
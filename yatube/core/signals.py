@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas: dict) -> None:
+    for pragma, value in pragmas.items():
+        cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor == 'sqlite' and pragmas:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
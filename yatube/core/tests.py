@@ -1,9 +1,441 @@
-from django.test import TestCase
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from io import StringIO
+
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import (
+    LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase,
+    override_settings
+)
 from http import HTTPStatus
 
+from posts import feed_cache
+from posts.models import Comment, Follow, Post, User
+from . import profiling, queries
+from .asgi import WSGIToASGI, _environ
+from .cache import SQLiteCache
+from .middleware import PIN_COOKIE, ReplicaMiddleware
+from .routers import ReplicaRouter
+
 
 class ViewTestClass(TestCase):
     def test_error_page(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+def set_in_child(location: str) -> None:
+    cache = SQLiteCache(location, {})
+    cache.set('from_child', 'value')
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_operations(self):
+        cache = self.cache
+        self.assertIsNone(cache.get('missing'))
+        cache.set('key', {'a': 1})
+        self.assertEqual(cache.get('key'), {'a': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 1))
+        self.assertEqual(cache.incr('new', 5), 6)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        self.assertEqual(
+            cache.get_many(['key', 'new', 'missing']),
+            {'key': {'a': 1}, 'new': 6},
+        )
+        cache.delete_many(['key', 'new'])
+        self.assertFalse(cache.has_key('key'))
+
+    def test_incr_many(self):
+        self.cache.set('old', 2)
+        self.cache.set('expired', 7, 0.01)
+        time.sleep(0.02)
+        self.cache.incr_many({'old': 3, 'new': 1, 'expired': 1})
+        self.assertEqual(
+            self.cache.get_many(['old', 'new', 'expired']),
+            {'old': 5, 'new': 1, 'expired': 1},
+        )
+
+    def test_expiry(self):
+        self.cache.set('key', 'value', 0.05)
+        self.assertTrue(self.cache.has_key('key'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'again'))
+        self.assertEqual(self.cache.get('key'), 'again')
+
+    def test_lru_eviction(self):
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_SIZE': 10_000}})
+        for i in range(8):
+            cache.set(f'key{i}', 'x' * 1000)
+            cache._db().execute(
+                'UPDATE cache_entry SET accessed = ? WHERE key LIKE ?',
+                (i, f'%key{i}'),
+            )
+        cache.get('key0')
+        cache.set('big', 'x' * 3000)
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNotNone(cache.get('big'))
+        self.assertIsNone(cache.get('key1'))
+        total, = cache._db().execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()
+        self.assertLessEqual(total, 10_000)
+
+    def test_shared_between_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=set_in_child, args=(self.location,))
+            for _ in range(2)
+        ]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+        self.assertEqual(self.cache.get('from_child'), 'value')
+        self.assertEqual(self.cache.get('counter'), 100)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            'cache_benchmark', workers=2, requests=50, pages=10, stdout=out
+        )
+        self.assertIn('shared: hit rate', out.getvalue())
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica1', 'replica2'], REPLICA_PIN_SECONDS=30
+)
+class ReplicaRoutingTest(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def serve(self, method='get', cookies=None):
+        routes = {}
+
+        def view(request):
+            routes['read'] = self.router.db_for_read(Post)
+            routes['write'] = self.router.db_for_write(Post)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(view)(request)
+        return routes, response
+
+    def test_read_only_requests_use_replicas(self):
+        routes, response = self.serve()
+        self.assertIn(routes['read'], ('replica1', 'replica2'))
+        self.assertEqual(routes['write'], 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_user_to_primary(self):
+        routes, response = self.serve('post')
+        self.assertEqual(routes, {'read': 'default', 'write': 'default'})
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 30)
+
+        routes, _ = self.serve(cookies={PIN_COOKIE: '1'})
+        self.assertEqual(routes['read'], 'default')
+
+    def test_primary_outside_requests_and_transactions(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with mock.patch.object(
+            connections['default'], 'in_atomic_block', True
+        ):
+            routes, _ = self.serve()
+        self.assertEqual(routes['read'], 'default')
+
+    def test_feed_cache_misses_read_the_primary(self):
+        cache.clear()
+        routes = []
+
+        @feed_cache.cache_feed(lambda: feed_cache.INDEX_FEED)
+        def view(request):
+            routes.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        for _ in range(2):
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            ReplicaMiddleware(view)(request)
+        self.assertEqual(routes, ['default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        routes, response = self.serve('post')
+        self.assertEqual(routes['read'], 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaFilesTest(SimpleTestCase):
+    """A primary and a lagging replica kept in two SQLite files."""
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        memory = connections['default']
+        memory.ensure_connection()
+        self.files = {}
+        for alias in ('default', 'replica1'):
+            self.files[alias] = DatabaseWrapper({
+                **memory.settings_dict,
+                'NAME': os.path.join(directory.name, f'{alias}.sqlite3'),
+            }, alias=alias)
+            self.files[alias].ensure_connection()
+        # The primary starts as a copy of the schema of the test database.
+        memory.connection.backup(self.files['default'].connection)
+        connections['default'] = self.files['default']
+        connections['replica1'] = self.files['replica1']
+        self.addCleanup(self.restore, memory)
+
+    def restore(self, memory):
+        connections['default'] = memory
+        del connections['replica1']
+        for wrapper in self.files.values():
+            wrapper.close()
+
+    def replicate(self):
+        """Copies the primary to the replica, which then lags behind."""
+        primary = self.files['default']
+        primary.ensure_connection()
+        primary.connection.backup(self.files['replica1'].connection)
+
+    def test_follow_reads_own_write(self):
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        self.client.force_login(reader)
+        self.replicate()
+        url = f'/profile/{author.username}/follow/'
+
+        response = self.client.get(url, follow=True)
+
+        self.assertTrue(response.context['following'])
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertFalse(Follow.objects.using('replica1').exists())
+        # Checked on the primary: no second row, no IntegrityError.
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(Follow.objects.filter(user=reader).count(), 1)
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    def test_new_connections_are_tuned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({
+                **connections['default'].settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            }, alias='pragmas')
+            pragmas = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                with wrapper.cursor() as cursor:
+                    journal_mode, = cursor.execute(
+                        'PRAGMA journal_mode'
+                    ).fetchone()
+                    synchronous, = cursor.execute(
+                        'PRAGMA synchronous'
+                    ).fetchone()
+            wrapper.close()
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(synchronous, 1)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            'sqlite_benchmark', readers=1, writers=1, duration=0.2,
+            stdout=out,
+        )
+        self.assertIn('production:', out.getvalue())
+
+
+def asgi_get(application, path: str) -> list:
+    """Drives `application` through one GET like an ASGI server would."""
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+    events = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class ASGITest(LiveServerTestCase):
+    def test_repeated_headers(self):
+        environ = _environ({
+            'method': 'GET', 'path': '/',
+            'headers': [
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+            ],
+        }, None)
+
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    def test_views_run_in_thread_pool(self):
+        application = WSGIToASGI(get_wsgi_application(), threads=2)
+        sent = asgi_get(application, '/about/author/')
+        application.executor.shutdown()
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], HTTPStatus.OK)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertTrue(body)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_load_test(self):
+        out = StringIO()
+        call_command(
+            'load_test', f'{self.live_server_url}/about/author/',
+            requests=10, concurrency=2, slow_clients=1, slow_delay=0.01,
+            stdout=out,
+        )
+        self.assertIn('10 ok, 0 errors', out.getvalue())
+        self.assertIn('p99', out.getvalue())
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTest(TestCase):
+    def profiled_get(self, path: str) -> tuple:
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get(path)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_timing_header_and_log_line(self):
+        Post.objects.create(text='Пост')
+        response, record = self.profiled_get('/')
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertGreater(record['sql_count'], 0)
+        self.assertIn('posts/index.html', record['templates'])
+        self.assertIn('includes/header.html', record['templates'])
+        self.assertAlmostEqual(
+            record['sql_ms'] + record['template_ms'] + record['python_ms'],
+            record['total_ms'], delta=0.1,
+        )
+
+    def test_cache_hits_and_misses(self):
+        _, first = self.profiled_get('/')
+        _, second = self.profiled_get('/')
+
+        self.assertGreater(first['counters']['cache.misses'], 0)
+        self.assertGreater(second['counters']['cache.hits'], 0)
+        self.assertLess(second['sql_count'], first['sql_count'])
+
+    def test_counters(self):
+        profiling.count('thumbnails.lookups')
+        with profiling.profile() as profile:
+            profiling.count('thumbnails.lookups')
+            profiling.count('thumbnails.misses', 2)
+
+        self.assertEqual(profile.counters['thumbnails.lookups'], 1)
+        self.assertIn('lookups=1 misses=2', profile.server_timing())
+        self.assertIsNone(profiling.current())
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get('/')
+
+        self.assertNotIn('Server-Timing', response)
+
+
+class QueryInspectionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            author = User.objects.create_user(username=f'author_{i}')
+            post = Post.objects.create(text='Пост', author=author)
+            Comment.objects.create(post=post, author=author, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_shape(self):
+        self.assertEqual(
+            queries.shape(
+                "SELECT * FROM t WHERE a = %s AND b IN (%s, %s) AND c = 'x'"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?',
+        )
+
+    def test_repeated_queries_in_template(self):
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}{% endfor %}'
+        )
+        with queries.inspect_queries(repeats=3) as inspection:
+            template.render(Context({'posts': Post.objects.all()}))
+
+        repeated = list(inspection.repeated().values())
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(len(repeated[0]), 3)
+        self.assertEqual(repeated[0][0].template, '<unknown source>:2')
+        self.assertTrue(repeated[0][0].origin.startswith('core/tests.py:'))
+
+    @override_settings(QUERY_INSPECTION='log', SLOW_QUERY_MS=0)
+    def test_log_per_view(self):
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[-1].getMessage())
+
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertIn('slow query', record['problems'][0])
+        self.assertGreater(queries.reports()['posts:index']['slow_queries'], 0)
+
+    @override_settings(QUERY_INSPECTION='log')
+    def test_unresolved_paths_share_a_report(self):
+        before = queries.reports().get(queries.UNRESOLVED, {'requests': 0})
+        for path in ('/missing/1/', '/missing/2/'):
+            self.client.get(path)
+
+        reports = queries.reports()
+        self.assertNotIn('/missing/1/', reports)
+        self.assertEqual(
+            reports[queries.UNRESOLVED]['requests'], before['requests'] + 2
+        )
+
+    @override_settings(QUERY_INSPECTION='raise', N_PLUS_ONE_THRESHOLD=1)
+    def test_raise(self):
+        with self.assertRaisesMessage(queries.QueryProblem, 'N+1'):
+            self.client.get('/')
@@ -0,0 +1,53 @@
+"""
+Fragment cache for rendered post cards.
+
+A card is cached under the ``version`` column of its post and the cached
+version of its author, so an edit of the post or a rename of the author
+renders it again. Feeds fetch
+all cards of a page with one ``get_many`` and render only the misses.
+"""
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import versions
+from .models import Post
+
+CACHE_TIMEOUT = getattr(settings, 'CARD_CACHE_TIMEOUT', 24 * 60 * 60)
+
+POST_CARD = 'posts/includes/post_list.html'
+PROFILE_CARD = 'posts/includes/profile_card.html'
+
+
+def author_version(author_id: int) -> str:
+    return f'card:author:{author_id}'
+
+
+def render_cards(posts: Iterable[Post], template_name: str = POST_CARD):
+    """Sets ``post.card`` to the rendered `template_name` for each post."""
+    posts = list(posts)
+    current = versions.get_versions(
+        {author_version(post.author_id) for post in posts}
+    )
+    keys = {
+        post.pk: 'card:{}:{}:{}:{}'.format(
+            template_name,
+            post.pk,
+            post.version,
+            current[author_version(post.author_id)],
+        )
+        for post in posts
+    }
+    cached = cache.get_many(keys.values())
+    rendered = {}
+    for post in posts:
+        card = cached.get(keys[post.pk])
+        if card is None:
+            card = render_to_string(template_name, {'post': post})
+            rendered[keys[post.pk]] = card
+        post.card = mark_safe(card)
+    if rendered:
+        cache.set_many(rendered, CACHE_TIMEOUT)
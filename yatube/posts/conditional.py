@@ -0,0 +1,141 @@
+"""
+Conditional GET for feeds and post pages.
+
+The ``ETag`` and ``Last-Modified`` of a page are built without rendering
+it, from the ``version`` and ``modified`` columns of the rows the page is
+about and from the versions of the feeds it lists, which every write
+already bumps (see `feed_cache`). A browser or proxy revalidating a page
+gets ``304 Not Modified`` without the view being run. Pages of logged-in
+users also depend on the user's own version, bumped when they follow or
+unfollow someone.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import condition
+
+from . import feed_cache, metrics, versions
+from .models import Group, Post
+
+STATS = ('not_modified', 'full')
+
+# ``(version, modified)`` of the rows a page is about.
+Rows = Sequence[Tuple[int, datetime]]
+
+metrics.counter(
+    'conditional.not_modified', 'Conditional pages answered with 304.'
+)
+metrics.counter('conditional.full', 'Conditional pages rendered in full.')
+
+
+class Validators(NamedTuple):
+    """What a page shows: feeds and ``(version, modified)`` of rows."""
+    feeds: List[str]
+    rows: Rows = ()
+
+
+def viewer_version(user_id: int) -> str:
+    return f'viewer:{user_id}'
+
+
+def stats() -> dict:
+    """Numbers of 304 and full responses to conditional pages."""
+    values = metrics.values(f'conditional.{stat}' for stat in STATS)
+    return {stat: values[f'conditional.{stat}'] for stat in STATS}
+
+
+def group_page(slug: str) -> Validators:
+    row = Group.objects.filter(slug=slug).values_list(
+        'version', 'modified'
+    ).first()
+    return Validators([feed_cache.group_feed(slug)], [row] if row else [])
+
+
+def post_page(post_id: int) -> Validators:
+    row = Post.objects.filter(pk=post_id).values_list(
+        'version', 'modified', 'group__version', 'group__modified',
+        'author__username',
+    ).first()
+    if row is None:
+        return Validators([])
+    version, modified, group_version, group_modified, username = row
+    # Comments and the author's post count live outside the post row.
+    feeds = [feed_cache.post_feed(post_id)]
+    if username:
+        feeds.append(feed_cache.profile_feed(username))
+    rows = [(version, modified)]
+    if group_version is not None:
+        rows.append((group_version, group_modified))
+    return Validators(feeds, rows)
+
+
+def _page_state(request: HttpRequest,
+                page: Callable[[], Validators]) -> Tuple[List[str], Rows]:
+    """Version names and rows the page depends on, for this viewer."""
+    # Both validators need the state: look it up only once.
+    if not hasattr(request, '_page_state'):
+        validators = page()
+        names = [feed_cache.version_name(feed) for feed in validators.feeds]
+        if request.user.is_authenticated:
+            names.append(viewer_version(request.user.pk))
+        request._page_state = (names, validators.rows)
+    return request._page_state
+
+
+def _etag(request: HttpRequest, names: List[str], rows: Rows) -> str:
+    current = versions.get_versions(names)
+    parts = [f'{name}={current[name]}' for name in sorted(current)]
+    parts.extend(str(version) for version, _ in rows)
+    # A page rendered for another user or session must not match.
+    parts.append(str(request.user.pk or 0))
+    parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _last_modified(names: List[str], rows: Rows) -> Optional[datetime]:
+    timestamp = versions.last_modified(names)
+    if timestamp is None:
+        return None
+    return max([
+        datetime.fromtimestamp(timestamp, timezone.utc),
+        *(modified for _, modified in rows),
+    ])
+
+
+def conditional_page(validators: Callable[..., Validators]):
+    """
+    Answers conditional requests to a view whose page depends on what
+    `validators` returns for the view arguments.
+    """
+    def etag(request: HttpRequest, *args, **kwargs) -> str:
+        names, rows = _page_state(
+            request, lambda: validators(*args, **kwargs)
+        )
+        return _etag(request, names, rows)
+
+    def last_modified(request: HttpRequest, *args,
+                      **kwargs) -> Optional[datetime]:
+        names, rows = _page_state(
+            request, lambda: validators(*args, **kwargs)
+        )
+        return _last_modified(names, rows)
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304:
+                metrics.incr('conditional.not_modified')
+            elif response.status_code == 200:
+                metrics.incr('conditional.full')
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,115 @@
+"""
+Denormalized counters of posts, comments and followers.
+
+The counters are bumped with ``F()`` expressions by model signals in the
+same transaction as the write that changes them. `rebuild` recomputes
+them from scratch and reports the rows that drifted.
+"""
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorCounters, Comment, Follow, Group, Post, User
+
+
+def author_counters(user_id: Optional[int]) -> AuthorCounters:
+    """Counters of an author; zeroes if nothing was counted yet."""
+    counters = AuthorCounters.objects.filter(user_id=user_id).first()
+    return counters or AuthorCounters(user_id=user_id)
+
+
+def bump_author(user_id: Optional[int], **deltas: int) -> None:
+    """Adds `deltas` (``posts_count=1`` etc.) to an author's counters."""
+    if user_id is None:
+        return
+    updates = {
+        field: F(field) + delta for field, delta in deltas.items()
+    }
+    if AuthorCounters.objects.filter(user_id=user_id).update(**updates):
+        return
+    # No row: nothing was counted yet, or the author is being deleted
+    # and the cascade dropped it first. Only a new count creates it.
+    if all(delta > 0 for delta in deltas.values()):
+        AuthorCounters.objects.get_or_create(user_id=user_id)
+        AuthorCounters.objects.filter(user_id=user_id).update(**updates)
+
+
+def bump_group(group_id: Optional[int], delta: int) -> None:
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def bump_post(post_id: int, delta: int) -> None:
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _drift(stored: Dict[int, int],
+           actual: Dict[int, int]) -> Iterator[Tuple[int, int, int]]:
+    for pk in stored.keys() | actual.keys():
+        if stored.get(pk, 0) != actual.get(pk, 0):
+            yield pk, stored.get(pk, 0), actual.get(pk, 0)
+
+
+def _counts(queryset, field: str) -> Dict[int, int]:
+    return dict(
+        queryset.order_by().values(field).annotate(
+            n=Count('pk')
+        ).values_list(field, 'n')
+    )
+
+
+def rebuild(dry_run: bool = False) -> Dict[str, list]:
+    """
+    Recomputes every counter and returns the drifted rows as
+    ``{counter: [(pk, stored, actual), ...]}``.
+    """
+    actual = {
+        'author.posts_count': _counts(
+            Post.objects.exclude(author=None), 'author'
+        ),
+        'author.followers_count': _counts(Follow.objects.all(), 'author'),
+        'group.posts_count': _counts(
+            Post.objects.exclude(group=None), 'group'
+        ),
+        'post.comments_count': _counts(Comment.objects.all(), 'post'),
+    }
+    authors = AuthorCounters.objects.values_list(
+        'user_id', 'posts_count', 'followers_count'
+    )
+    stored = {
+        'author.posts_count': {pk: n for pk, n, _ in authors},
+        'author.followers_count': {pk: n for pk, _, n in authors},
+        'group.posts_count': dict(
+            Group.objects.values_list('pk', 'posts_count')
+        ),
+        'post.comments_count': dict(
+            Post.objects.exclude(comments_count=0).values_list(
+                'pk', 'comments_count'
+            )
+        ),
+    }
+    drift = {
+        counter: sorted(_drift(stored[counter], actual[counter]))
+        for counter in actual
+    }
+    if dry_run:
+        return drift
+
+    with transaction.atomic():
+        for field in ('posts_count', 'followers_count'):
+            for pk, _, value in drift[f'author.{field}']:
+                if not User.objects.filter(pk=pk).exists():
+                    continue
+                AuthorCounters.objects.update_or_create(
+                    user_id=pk, defaults={field: value}
+                )
+        for pk, _, value in drift['group.posts_count']:
+            Group.objects.filter(pk=pk).update(posts_count=value)
+        for pk, _, value in drift['post.comments_count']:
+            Post.objects.filter(pk=pk).update(comments_count=value)
+    return drift
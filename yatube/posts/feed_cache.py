@@ -0,0 +1,175 @@
+"""
+Full-page cache for post feeds with event-driven invalidation.
+
+Every feed (the index page, a group, an author's profile) has a version
+number that is part of the cache key of each of its pages. Writes to a
+post bump the versions of exactly the feeds the post is shown in, which
+drops all of their cached pages at once and leaves other feeds alone.
+
+Only pages for anonymous visitors are cached, keyed on the URL path and
+the page number or cursor; logged-in users see their own name and edit
+links and are always served by the view.
+"""
+import hashlib
+from collections import Counter
+from functools import wraps
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+
+from core.routers import replica_reads
+from . import metrics, versions
+from .models import Group, Post, User
+
+CACHE_TIMEOUT = getattr(settings, 'FEED_CACHE_TIMEOUT', 6 * 60 * 60)
+
+INDEX_FEED = 'index'
+STATS = ('hits', 'misses', 'bypasses', 'invalidations')
+CACHED_FEEDS = ('index', 'group', 'profile')
+# Query parameters that select the page; any others are ignored.
+PAGE_PARAMS = ('page', 'cursor')
+
+for stat, description in (
+    ('hits', 'Feed pages served from the cache.'),
+    ('misses', 'Feed pages rendered and cached.'),
+    ('bypasses', 'Feed pages rendered for logged-in users.'),
+):
+    metrics.counter(f'feed_cache.{stat}', description, feed=CACHED_FEEDS)
+metrics.counter(
+    'feed_cache.invalidations', 'Feed versions bumped by writes.',
+    feed=(*CACHED_FEEDS, 'post'),
+)
+
+
+def group_feed(slug: str) -> str:
+    return f'group:{slug}'
+
+
+def profile_feed(username: str) -> str:
+    return f'profile:{username}'
+
+
+def post_feed(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def version_name(feed: str) -> str:
+    return f'feed:{feed}'
+
+
+def _feed_version(feed: str) -> int:
+    return versions.get_version(version_name(feed))
+
+
+def _key_prefix(feed: str) -> str:
+    return f'feed.{feed}.{_feed_version(feed)}'
+
+
+def _cache_key(feed: str, request: HttpRequest,
+               params: Iterable[str] = PAGE_PARAMS) -> str:
+    """The path and the page of the request, under the feed version."""
+    page = '|'.join((
+        request.path, *(request.GET.get(param, '') for param in params)
+    ))
+    digest = hashlib.md5(page.encode()).hexdigest()
+    return f'{_key_prefix(feed)}.{digest}'
+
+
+def feed_kind(feed: str) -> str:
+    """``index``, ``group``, ``profile`` or ``post``."""
+    return feed.split(':', 1)[0]
+
+
+def _incr(stat: str, feed: str, delta: int = 1) -> None:
+    metrics.incr(f'feed_cache.{stat}', delta, feed=feed_kind(feed))
+
+
+def stats() -> dict:
+    """Hit/miss/invalidation counters of the feed cache."""
+    return {stat: metrics.total(f'feed_cache.{stat}') for stat in STATS}
+
+
+def invalidate(feeds: Iterable[str]) -> None:
+    """
+    Drops every cached page of the given feeds now and again once the
+    current transaction commits: a reader that still saw the old rows in
+    between may have filled the new version.
+    """
+    feeds = set(feeds)
+    names = [version_name(feed) for feed in feeds]
+    versions.bump(names)
+    transaction.on_commit(lambda: versions.bump(names))
+    for kind, count in Counter(map(feed_kind, feeds)).items():
+        metrics.incr('feed_cache.invalidations', count, feed=kind)
+
+
+def post_feeds(post_id: Optional[int]) -> List[str]:
+    """Feeds the post with `post_id` is currently shown in."""
+    if post_id is None:
+        return []
+    row = Post.objects.filter(pk=post_id).values_list(
+        'group__slug', 'author__username'
+    ).first()
+    if row is None:
+        return []
+    group_slug, username = row
+    feeds = [INDEX_FEED, post_feed(post_id)]
+    if group_slug:
+        feeds.append(group_feed(group_slug))
+    if username:
+        feeds.append(profile_feed(username))
+    return feeds
+
+
+def author_feeds(author: User) -> List[str]:
+    """Feeds showing posts of `author`, whose cards carry the name."""
+    slugs = Group.objects.filter(
+        posts__author=author
+    ).values_list('slug', flat=True).distinct()
+    return (
+        [INDEX_FEED, profile_feed(author.username)]
+        + [group_feed(slug) for slug in slugs]
+    )
+
+
+def cache_feed(feed: Callable[..., str],
+               params: Iterable[str] = PAGE_PARAMS):
+    """
+    Caches the pages of a feed view for anonymous visitors under the
+    current version of the feed returned by `feed` for the view arguments.
+    Pages differ by path and by the query parameters in `params`.
+
+    Misses are rendered from the primary: a lagging replica would store
+    rows older than the version they are cached under.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            feed_name = feed(*args, **kwargs)
+            if request.user.is_authenticated:
+                _incr('bypasses', feed_name)
+                return view(request, *args, **kwargs)
+
+            cache_key = _cache_key(feed_name, request, params)
+            response = cache.get(cache_key)
+            if response is not None:
+                _incr('hits', feed_name)
+                return response
+            _incr('misses', feed_name)
+
+            with replica_reads(False):
+                response = view(request, *args, **kwargs)
+            if (response.streaming or response.status_code != 200
+                    or response.cookies):
+                return response
+            cache.set(cache_key, response, CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -12,6 +14,35 @@ class PostForm(forms.ModelForm):
             'image',
         )
 
+    def full_clean(self):
+        # Oversized uploads were stopped while streaming: report them
+        # instead of letting Pillow fail on a truncated file.
+        oversized = [
+            name for name, file in self.files.items()
+            if uploads.is_oversized(file)
+        ]
+        if oversized:
+            self.files = self.files.copy()
+            for name in oversized:
+                del self.files[name]
+        super().full_clean()
+        for name in oversized:
+            self.add_error(name, (
+                'Файл слишком большой: максимум '
+                f'{uploads.MAX_SIZE // (1024 * 1024)} МБ.'
+            ))
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        width, height = image.image.size
+        if width * height > uploads.MAX_PIXELS:
+            raise forms.ValidationError(
+                f'Слишком большое изображение: {width}×{height} пикселей.'
+            )
+        return uploads.downscale(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
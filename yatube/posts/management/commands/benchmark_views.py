@@ -0,0 +1,276 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from io import StringIO
+from typing import List, NamedTuple, Optional
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.percentiles import percentiles
+from posts import metrics
+from posts.models import Follow, Group, Post
+from .seed_data import WORDS
+
+User = get_user_model()
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# The cache and the metrics of the site being benchmarked are left alone.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark_views',
+    },
+    metrics.CACHE: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark_views_metrics',
+    },
+}
+
+
+class Scenario(NamedTuple):
+    """Requests to one route; request ``i`` goes to ``urls[i % len]``."""
+    route: str
+    urls: List[str]
+    data: Optional[dict] = None
+
+
+def scenarios(user: User, requests: int) -> List[Scenario]:
+    """Requests to every route of the posts app, made on behalf of `user`."""
+    group = Group.objects.order_by('-posts_count').first()
+    author = User.objects.annotate(
+        posts_total=Count('posts')
+    ).order_by('-posts_total').first()
+    posts = list(Post.objects.values_list('pk', flat=True)[:requests + 2])
+    own_post = Post.objects.create(text='Пост для правки', author=user)
+    # Following and unfollowing again are no-ops: each request needs
+    # another author.
+    strangers = list(
+        User.objects.exclude(following__user=user).exclude(
+            pk=user.pk
+        ).values_list('username', flat=True)[:requests + 2]
+    )
+
+    def urls(name: str, values, key: str) -> List[str]:
+        return [
+            reverse(f'posts:{name}', kwargs={key: value})
+            for value in values
+        ]
+
+    return [
+        Scenario('index', [reverse('posts:index')]),
+        Scenario('group_list', urls('group_list', [group.slug], 'slug')),
+        Scenario('profile', urls('profile', [author.username], 'username')),
+        Scenario('post_detail', urls('post_detail', posts, 'post_id')),
+        Scenario('follow_index', [reverse('posts:follow_index')]),
+        Scenario('search', [f'{reverse("posts:search")}?q={WORDS[0]}']),
+        Scenario(
+            'post_create', [reverse('posts:post_create')],
+            {'text': 'Новый пост', 'group': group.pk},
+        ),
+        Scenario(
+            'post_edit', urls('post_edit', [own_post.pk], 'post_id'),
+            {'text': 'Исправленный пост', 'group': group.pk},
+        ),
+        Scenario(
+            'add_comment', urls('add_comment', posts, 'post_id'),
+            {'text': 'Комментарий'},
+        ),
+        Scenario(
+            'profile_follow',
+            urls('profile_follow', strangers, 'username'),
+        ),
+        Scenario(
+            'profile_unfollow',
+            urls('profile_unfollow', strangers, 'username'),
+        ),
+    ]
+
+
+def latency_percentiles(latencies: List[float]) -> dict:
+    return {
+        f'p{percentile}_ms': round(value * 1000, 3)
+        for percentile, value in percentiles(latencies).items()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет задержки, число запросов к базе и память для всех '
+        'страниц постов на заполненных базах разного размера и сохраняет '
+        'результаты в JSON. С --compare сравнивает их с прошлым прогоном '
+        'и завершается с ошибкой при регрессии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+            help='Число постов в заполняемых базах.',
+        )
+        parser.add_argument(
+            '--use-current-database', action='store_true',
+            help='Измерить текущую базу вместо заполнения новых.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Число измеряемых запросов к каждой странице.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения.',
+        )
+        parser.add_argument(
+            '--max-slowdown', type=float, default=1.25,
+            help='Допустимый рост p95 относительно прошлого прогона.',
+        )
+
+    def measure(self, client: Client, scenario: Scenario,
+                requests: int) -> dict:
+        def request(number: int):
+            url = scenario.urls[number % len(scenario.urls)]
+            if scenario.data is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, scenario.data)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{scenario.route}: {url} -> {response.status_code}'
+                )
+
+        # Warm up templates and caches, then trace one request apart from
+        # the timed ones, as tracing slows every allocation down.
+        request(0)
+        # A full query log would stop growing and hide the queries.
+        connection.queries_log.clear()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            request(1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Read before the next request clears the query log.
+        query_count = len(queries)
+
+        latencies = []
+        for number in range(2, requests + 2):
+            started = time.perf_counter()
+            request(number)
+            latencies.append(time.perf_counter() - started)
+        return {
+            **latency_percentiles(latencies),
+            'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+            'queries': query_count,
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def run(self, requests: int) -> dict:
+        user = User.objects.filter(
+            pk__in=Follow.objects.values('user')
+        ).first() or User.objects.create_user(username='benchmark')
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for scenario in scenarios(user, requests):
+            results[scenario.route] = self.measure(client, scenario, requests)
+            self.stdout.write(
+                f'  {scenario.route:>16}: '
+                + ', '.join(
+                    f'{key} {value}'
+                    for key, value in results[scenario.route].items()
+                )
+            )
+        return results
+
+    def run_seeded(self, size: int, requests: int) -> dict:
+        test_settings = connection.settings_dict['TEST']
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # A file, unlike the default in-memory test database, is
+                # what the site runs on, and is gone after each size.
+                connection.settings_dict['TEST'] = {
+                    **test_settings,
+                    'NAME': os.path.join(directory, 'benchmark.sqlite3'),
+                }
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                call_command(
+                    'seed_data', posts=size, users=max(size // 10, 10),
+                    groups=max(min(size // 100, 100), 1),
+                    comments=size * 2, follows=size, stdout=StringIO(),
+                )
+                return self.run(requests)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                connection.settings_dict['TEST'] = test_settings
+
+    def compare(self, baseline: dict, current: dict,
+                max_slowdown: float) -> List[str]:
+        regressions = []
+        for size, routes in current['sizes'].items():
+            for route, result in routes.items():
+                before = baseline['sizes'].get(size, {}).get(route)
+                if before is None:
+                    continue
+                if result['p95_ms'] > before['p95_ms'] * max_slowdown:
+                    regressions.append(
+                        f'{size}/{route}: p95 {before["p95_ms"]} -> '
+                        f'{result["p95_ms"]} ms'
+                    )
+                if result['queries'] > before['queries']:
+                    regressions.append(
+                        f'{size}/{route}: queries {before["queries"]} -> '
+                        f'{result["queries"]}'
+                    )
+        return regressions
+
+    def handle(self, *args, **options):
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'sizes': {},
+        }
+        with override_settings(CACHES=CACHES):
+            if options['use_current_database']:
+                size = str(Post.objects.count())
+                self.stdout.write(f'{size} posts (current database)')
+                report['sizes'][size] = self.run(options['requests'])
+            else:
+                for size in options['sizes']:
+                    self.stdout.write(f'{size} posts')
+                    report['sizes'][str(size)] = self.run_seeded(
+                        size, options['requests']
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = self.compare(
+                    json.load(baseline), report, options['max_slowdown']
+                )
+            if regressions:
+                raise CommandError(
+                    'Regressions:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,107 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, POSTS_PER_PAGE
+)
+
+# Plan lines that mean a whole table is read or rows are sorted in memory.
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?\w+(?! USING)( |$)'),
+    'postgresql': re.compile(r'Seq Scan'),
+    'mysql': re.compile(r'\bALL\b'),
+}
+SORT = {
+    'sqlite': re.compile(r'TEMP B-TREE'),
+    'postgresql': re.compile(r'\bSort\b'),
+    'mysql': re.compile(r'filesort'),
+}
+
+
+def keyset(queryset, row, tiebreak='pk'):
+    """The queryset of the page after `row`, as the paginator builds it."""
+    return queryset.filter(
+        Q(pub_date__lt=row.pub_date)
+        | Q(pub_date=row.pub_date, **{f'{tiebreak}__lt': row.pk})
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов лент и сообщает о полных '
+        'просмотрах таблиц и сортировках без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных.',
+        )
+
+    def querysets(self):
+        post = Post.objects.first()
+        group = Group.objects.first()
+        author = User.objects.filter(posts__isnull=False).first()
+        follower = Follow.objects.values_list('user', flat=True).first()
+        if None in (post, group, author, follower):
+            raise CommandError(
+                'Нужны хотя бы один пост, группа, автор и подписка.'
+            )
+        per_page = POSTS_PER_PAGE + 1
+        feeds = {
+            'index': Post.objects.for_feed(),
+            'group_list': Post.objects.filter(group=group).for_feed(),
+            'profile': Post.objects.filter(author=author).for_feed(),
+        }
+        for name, feed in feeds.items():
+            feed = feed.order_by('-pub_date', '-pk')
+            yield name, feed[:per_page]
+            yield f'{name} (cursor)', keyset(feed, post)[:per_page]
+
+        yield 'post_detail', Post.objects.for_feed().filter(pk=post.pk)
+        yield 'post_detail comments', Comment.objects.filter(
+            post=post
+        ).select_related('author')
+
+        timeline = TimelineEntry.objects.filter(user=follower).order_by(
+            '-pub_date', '-post_id'
+        )
+        yield 'follow_index', timeline[:per_page]
+        entry = timeline.first()
+        if entry is not None:
+            entry.pk = entry.post_id
+            yield 'follow_index (cursor)', keyset(
+                timeline, entry, 'post_id'
+            )[:per_page]
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN:
+            raise CommandError(f'EXPLAIN для {vendor} не поддерживается.')
+
+        problems = 0
+        for name, queryset in self.querysets():
+            plan = queryset.explain()
+            flags = []
+            if FULL_SCAN[vendor].search(plan):
+                flags.append('FULL SCAN')
+            if SORT[vendor].search(plan):
+                flags.append('SORT')
+            if flags:
+                problems += 1
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: {", ".join(flags)}'
+                ))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if flags or options['verbose_plans']:
+                self.stdout.write(plan)
+
+        if problems:
+            raise CommandError(
+                f'Запросов без покрывающего индекса: {problems}'
+            )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import conditional, feed_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает счётчики кеша лент (попадания, промахи, сбросы) '
+        'и число ответов 304 на условные запросы.'
+    )
+
+    def handle(self, *args, **options):
+        stats = feed_cache.stats()
+        for stat, value in stats.items():
+            self.stdout.write(f'{stat}: {value}')
+        lookups = stats['hits'] + stats['misses']
+        if lookups:
+            self.stdout.write(f'hit_rate: {stats["hits"] / lookups:.2%}')
+
+        responses = conditional.stats()
+        for stat, value in responses.items():
+            self.stdout.write(f'conditional_{stat}: {value}')
+        total = sum(responses.values())
+        if total:
+            self.stdout.write(
+                f'not_modified_rate: {responses["not_modified"] / total:.2%}'
+            )
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует адаптивные варианты изображений (JPEG и WebP) '
+        'для уже загруженных картинок постов, параллельно на всех ядрах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Количество процессов (по умолчанию — число ядер).',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты, даже если они уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        images = {}
+        posts = Post.objects.exclude(image='').values_list('pk', 'image')
+        for post_id, image_name in posts.iterator():
+            images.setdefault(image_name, []).append(post_id)
+        if not options['force']:
+            # The files, unlike a per-process cache, show earlier runs.
+            images = {
+                name: post_ids for name, post_ids in images.items()
+                if thumbnails.stored_variants(name) is None
+            }
+        self.stdout.write(f'Images to process: {len(images)}')
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write(
+                'The cache is local to this process (CACHE_BACKEND=locmem): '
+                'the site finds the new variants on disk, but feed pages it '
+                'has cached show them only once they expire.'
+            )
+
+        # Forked workers must not share the parent's DB connections.
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['jobs']) as pool:
+            futures = {
+                pool.submit(thumbnails.render_variants, name): name
+                for name in images
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                for post_id in images[name]:
+                    thumbnails.store(post_id, name, variants)
+                if done % 100 == 0:
+                    self.stdout.write(f'{done}/{len(images)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {len(images) - failed} processed, {failed} failed.'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписчиков '
+        'и сообщает о расхождениях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.rebuild(dry_run=options['dry_run'])
+        for counter, rows in drift.items():
+            self.stdout.write(f'{counter}: {len(rows)} drifted')
+            for pk, stored, actual in rows:
+                self.stdout.write(f'  {pk}: {stored} -> {actual}')
+        if not options['dry_run'] and any(drift.values()):
+            self.stdout.write(self.style.SUCCESS('Counters rebuilt.'))
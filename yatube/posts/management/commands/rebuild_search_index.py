@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        backend = 'FTS5' if search.uses_fts() else 'SearchTerm'
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} posts and comments ({backend}).'
+        ))
@@ -0,0 +1,413 @@
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from posts import feed_cache, search
+from posts.models import (
+    AuthorCounters, Comment, Follow, Group, Post, TimelineEntry, User
+)
+from posts.timeline import FANOUT_LIMIT
+
+BATCH_SIZE = 5000
+# Seeded posts are spread over the days before this moment, so that the
+# same seed gives the same rows whenever it is run.
+END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Share of posts written within a burst, and how much shorter the gaps
+# between them are than the average gap.
+BURST_SHARE = 0.9
+BURST_GAP = 0.1
+BURST_SAME_AUTHOR = 0.7
+GROUP_SHARE = 0.7
+COMMENT_DELAY = 3 * 60 * 60
+
+USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'password',
+    'is_superuser', 'is_staff', 'is_active', 'date_joined',
+)
+GROUP_FIELDS = (
+    'id', 'title', 'slug', 'description', 'posts_count', 'modified',
+    'version',
+)
+FOLLOW_FIELDS = ('id', 'user', 'author')
+POST_FIELDS = (
+    'id', 'text', 'author', 'group', 'image', 'comments_count', 'pub_date',
+    'modified', 'version',
+)
+COMMENT_FIELDS = ('id', 'post', 'author', 'text', 'pub_date')
+COUNTER_FIELDS = (
+    'user', 'posts_count', 'followers_count', 'fanout_paused_at',
+)
+
+WORDS = (
+    'день', 'город', 'утро', 'кофе', 'книга', 'дорога', 'море', 'работа',
+    'друг', 'вечер', 'музыка', 'фото', 'кошка', 'собака', 'погода',
+    'дождь', 'солнце', 'лес', 'поезд', 'новый', 'старый', 'хороший',
+    'большой', 'тихий', 'сегодня', 'вчера', 'завтра', 'снова', 'очень',
+    'читать', 'писать', 'гулять', 'смотреть', 'думать', 'любить',
+    'ехать', 'слушать', 'играть', 'готовить', 'отдыхать',
+)
+
+
+def zipf_weights(n: int, exponent: float) -> list:
+    """Cumulative weights of ranks ``0..n-1`` under a power law."""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+
+def draw_count(rng: random.Random, mean: float) -> int:
+    """Exponentially distributed whole number with the given mean."""
+    if mean <= 0:
+        return 0
+    return int(rng.expovariate(1 / mean) + rng.random())
+
+
+def next_id(model) -> int:
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def batches(rows, size: int = BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(model, fields, rows) -> int:
+    """
+    Inserts tuples of values of `fields` in batches. Unlike
+    ``bulk_create`` this builds neither model instances nor SQL for every
+    row, which takes most of the time of ``bulk_create`` on large loads.
+    """
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(field).column for field in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    total = 0
+    with connection.cursor() as cursor:
+        for batch in batches(rows):
+            cursor.executemany(sql, batch)
+            total += len(batch)
+    return total
+
+
+def fan_out(first_follow: int) -> int:
+    """
+    Copies the posts of light authors into the timelines of the seeded
+    followers in one statement, as publishing them one by one would.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, author_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {AuthorCounters._meta.db_table} c '
+            f'ON c.user_id = f.author_id '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'WHERE f.id >= %s AND c.fanout_paused_at IS NULL',
+            [first_follow],
+        )
+        return cursor.rowcount
+
+
+class Seeder:
+    """
+    Generates the rows for one seed. Followers go to author ``rank`` with
+    a weight falling off as a power of the rank, so a few authors get
+    most of them; posts are spread the same way over another, shuffled
+    ranking, as the most followed authors are not the most prolific.
+    """
+
+    def __init__(self, options: dict):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.prefix = options['prefix']
+        self.users = options['users']
+        self.groups = options['groups']
+        self.start = END - timedelta(days=options['days'])
+        self.author_weights = zipf_weights(self.users, options['exponent'])
+        self.group_weights = zipf_weights(self.groups, options['exponent'])
+        self.word_weights = zipf_weights(len(WORDS), 1.0)
+        self.activity = list(range(self.users))
+        self.rng.shuffle(self.activity)
+        self.first_user = next_id(User)
+        self.first_group = next_id(Group)
+        self.first_post = next_id(Post)
+        self.first_comment = next_id(Comment)
+        self.first_follow = next_id(Follow)
+        self.posts_count = Counter()
+        self.group_posts_count = Counter()
+        self.followers_count = Counter()
+
+    def date(self, moment: datetime):
+        return connection.ops.adapt_datetimefield_value(moment)
+
+    def rank(self) -> int:
+        return bisect(self.author_weights,
+                      self.rng.random() * self.author_weights[-1])
+
+    def author(self) -> int:
+        return self.first_user + self.rank()
+
+    def poster(self) -> int:
+        return self.first_user + self.activity[self.rank()]
+
+    def group(self):
+        if not self.groups or self.rng.random() > GROUP_SHARE:
+            return None
+        rank = bisect(self.group_weights,
+                      self.rng.random() * self.group_weights[-1])
+        return self.first_group + rank
+
+    def text(self, low: int, high: int) -> str:
+        words = self.rng.choices(
+            WORDS, cum_weights=self.word_weights,
+            k=self.rng.randint(low, high),
+        )
+        return ' '.join(words).capitalize() + '.'
+
+    def user_rows(self, password: str):
+        joined = self.date(self.start)
+        for pk in range(self.first_user, self.first_user + self.users):
+            yield (
+                pk, f'{self.prefix}{pk}', self.prefix.capitalize(), str(pk),
+                '', password, False, False, True, joined,
+            )
+
+    def group_rows(self):
+        modified = self.date(self.start)
+        for pk in range(self.first_group, self.first_group + self.groups):
+            yield (
+                pk, f'Группа {pk}', f'{self.prefix}-{pk}', self.text(5, 20),
+                0, modified, 1,
+            )
+
+    def follow_rows(self):
+        mean = self.options['follows'] / self.users if self.users else 0
+        pk = self.first_follow
+        for follower in range(self.first_user, self.first_user + self.users):
+            wanted = min(draw_count(self.rng, mean), self.users - 1)
+            authors = set()
+            # Popular authors are drawn again and again: give up on
+            # reaching `wanted` rather than loop for long.
+            for _ in range(wanted * 4):
+                if len(authors) == wanted:
+                    break
+                author = self.author()
+                if author != follower:
+                    authors.add(author)
+            for author in sorted(authors):
+                self.followers_count[author] += 1
+                yield pk, follower, author
+                pk += 1
+
+    def publication_times(self, posts: int) -> list:
+        """
+        Bursty publication moments: most posts follow the previous one
+        closely, and bursts are separated by long pauses.
+        """
+        long_gap = (1 - BURST_SHARE * BURST_GAP) / (1 - BURST_SHARE)
+        gaps = []
+        for _ in range(posts):
+            burst = self.rng.random() < BURST_SHARE
+            gaps.append((
+                self.rng.expovariate(1 / (BURST_GAP if burst else long_gap)),
+                burst,
+            ))
+        span = (END - self.start).total_seconds()
+        scale = span / (sum(gap for gap, _ in gaps) or 1)
+        moments, elapsed = [], 0.0
+        for gap, burst in gaps:
+            elapsed += gap * scale
+            moments.append((self.start + timedelta(seconds=elapsed), burst))
+        return moments
+
+    def post_rows(self):
+        """Pairs of a post row and the rows of its comments."""
+        posts = self.options['posts']
+        if not posts:
+            return
+        # Posts of popular authors draw more comments; `boost` keeps the
+        # expected total at the requested number.
+        total = self.author_weights[-1]
+        weights = [
+            (b - a) / total for a, b in zip([0.0] + self.author_weights,
+                                            self.author_weights)
+        ]
+        boost = 1 / sum(
+            weights[rank] * weights[self.activity[rank]]
+            for rank in range(self.users)
+        )
+        mean_comments = self.options['comments'] / posts
+        comment_pk = self.first_comment
+        author = None
+        moments = self.publication_times(posts)
+        for pk, (pub_date, burst) in enumerate(moments, self.first_post):
+            if (author is None or not burst
+                    or self.rng.random() > BURST_SAME_AUTHOR):
+                author = self.poster()
+            group = self.group()
+            self.posts_count[author] += 1
+            if group is not None:
+                self.group_posts_count[group] += 1
+            count = draw_count(
+                self.rng,
+                mean_comments * weights[author - self.first_user] * boost,
+            )
+            comments = []
+            for _ in range(count):
+                delay = self.rng.expovariate(1 / COMMENT_DELAY)
+                commenter = self.first_user + self.rng.randrange(self.users)
+                comments.append((
+                    comment_pk, pk, commenter, self.text(2, 15),
+                    self.date(pub_date + timedelta(seconds=delay)),
+                ))
+                comment_pk += 1
+            date = self.date(pub_date)
+            post = (
+                pk, self.text(5, 40), author, group, '', count, date, date, 1,
+            )
+            yield post, comments
+
+    def counter_rows(self):
+        for author in sorted(self.posts_count.keys()
+                             | self.followers_count.keys()):
+            followers = self.followers_count[author]
+            yield (
+                author, self.posts_count[author], followers,
+                END if followers > FANOUT_LIMIT else None,
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу большим объёмом тестовых данных: пользователями, '
+        'группами, постами, комментариями и подписками. При одинаковом '
+        '--seed данные одинаковы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10000,
+            help='Число пользователей.',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=100,
+            help='Число групп.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=100000,
+            help='Число постов.',
+        )
+        parser.add_argument(
+            '--comments', type=int, default=200000,
+            help='Примерное число комментариев.',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=200000,
+            help='Примерное число подписок.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить посты.',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.0,
+            help='Показатель степенного закона популярности авторов.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и слагов групп.',
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль всех пользователей; по умолчанию вход запрещён.',
+        )
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Не перестраивать поисковый индекс.',
+        )
+
+    def report(self, name: str, count: int, started: float) -> None:
+        self.stdout.write(
+            f'{name}: {count} in {time.monotonic() - started:.1f}s'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and (options['posts'] or options['follows']):
+            raise CommandError('Для постов и подписок нужны пользователи.')
+        if User.objects.filter(
+            username__startswith=options['prefix']
+        ).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {options["prefix"]!r} уже есть; '
+                f'укажите другой --prefix.'
+            )
+        started = time.monotonic()
+        seeder = Seeder(options)
+        # Hashing is slow: every seeded user shares one hash.
+        password = make_password(options['password'])
+        with transaction.atomic():
+            self.seed(seeder, password)
+        if not options['skip_search_index']:
+            step = time.monotonic()
+            self.report('search index', search.rebuild(), step)
+        feed_cache.invalidate([feed_cache.INDEX_FEED])
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def seed(self, seeder: Seeder, password: str) -> None:
+        step = time.monotonic()
+        count = insert(User, USER_FIELDS, seeder.user_rows(password))
+        self.report('users', count, step)
+        step = time.monotonic()
+        count = insert(Group, GROUP_FIELDS, seeder.group_rows())
+        self.report('groups', count, step)
+        step = time.monotonic()
+        count = insert(Follow, FOLLOW_FIELDS, seeder.follow_rows())
+        self.report('follows', count, step)
+
+        step = time.monotonic()
+        totals = Counter()
+        for batch in batches(seeder.post_rows()):
+            totals['posts'] += insert(
+                Post, POST_FIELDS, (post for post, _ in batch)
+            )
+            totals['comments'] += insert(
+                Comment, COMMENT_FIELDS,
+                (comment for _, comments in batch for comment in comments),
+            )
+        self.report('posts', totals['posts'], step)
+        self.report('comments', totals['comments'], step)
+
+        for group, count in seeder.group_posts_count.items():
+            Group.objects.filter(pk=group).update(posts_count=count)
+        step = time.monotonic()
+        count = insert(AuthorCounters, COUNTER_FIELDS, seeder.counter_rows())
+        self.report('counters', count, step)
+        step = time.monotonic()
+        self.report('timeline entries', fan_out(seeder.first_follow), step)
+        # Rows were inserted with explicit ids: move the sequences on.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Group, Follow, Post, Comment]
+            ):
+                cursor.execute(sql)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Показывает очередь и время генерации миниатюр.'
+
+    def handle(self, *args, **options):
+        stats = thumbnails.stats()
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
+        done = stats['processed'] + stats['failed']
+        if done:
+            self.stdout.write(
+                f'avg_processing_ms: {stats["processing_ms"] / done:.1f}'
+            )
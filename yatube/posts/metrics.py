@@ -0,0 +1,275 @@
+"""
+Counters and histograms for monitoring, kept in the ``METRICS_CACHE``
+cache so that every worker process adds to the same numbers. That cache
+must be shared by the workers and never evict entries: the default
+settings keep it in its own SQLite file with no size cap.
+
+Metrics are declared with `counter`, `gauge` and `histogram` when their
+module is imported, along with every value of their labels. Any worker
+can thus list all series, which the cache itself cannot, and render
+them for Prometheus (see `exposition`).
+
+Updates are added up in the process and written to the cache in one
+batch at most every ``METRICS_FLUSH_INTERVAL`` seconds, and before each
+read: a write per update would cost a cache transaction each.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from itertools import product
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+CACHE = getattr(settings, 'METRICS_CACHE', 'metrics')
+PREFIX = 'yatube'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Histogram sums are kept as whole millionths, as the cache adds integers.
+SUM_SCALE = 1_000_000
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+
+
+class Metric(NamedTuple):
+    name: str
+    kind: str
+    description: str
+    labels: Dict[str, Tuple[str, ...]]
+    buckets: Tuple[float, ...] = ()
+
+    def series(self) -> List[Dict[str, str]]:
+        """Label sets of every series of the metric."""
+        names = sorted(self.labels)
+        return [
+            dict(zip(names, values))
+            for values in product(*(self.labels[name] for name in names))
+        ]
+
+
+_registry: Dict[str, Metric] = {}
+
+
+def _declare(name: str, kind: str, description: str, labels: dict,
+             buckets: Tuple[float, ...] = ()) -> Metric:
+    metric = Metric(
+        name, kind, description,
+        {label: tuple(values) for label, values in labels.items()},
+        tuple(buckets),
+    )
+    _registry[name] = metric
+    return metric
+
+
+def counter(name: str, description: str, **labels: Iterable[str]) -> Metric:
+    return _declare(name, 'counter', description, labels)
+
+
+def gauge(name: str, description: str, **labels: Iterable[str]) -> Metric:
+    return _declare(name, 'gauge', description, labels)
+
+
+def histogram(name: str, description: str, buckets=DEFAULT_BUCKETS,
+              **labels: Iterable[str]) -> Metric:
+    return _declare(name, 'histogram', description, labels, buckets)
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    pairs = ','.join(f'{label}={labels[label]}' for label in sorted(labels))
+    return f'{name}{{{pairs}}}'
+
+
+def _store() -> BaseCache:
+    return caches[CACHE]
+
+
+def _key(name: str) -> str:
+    return f'metrics:{name}'
+
+
+_pending: Dict[str, int] = {}
+_pending_lock = threading.Lock()
+_flushed = time.monotonic()
+
+
+def _write(deltas: Dict[str, int]) -> None:
+    store = _store()
+    if hasattr(store, 'incr_many'):
+        store.incr_many(deltas)
+        return
+    for key, delta in deltas.items():
+        try:
+            store.incr(key, delta)
+        except ValueError:
+            if not store.add(key, delta, None):
+                store.incr(key, delta)
+
+
+def flush() -> None:
+    """Writes the updates pending in this process to the cache."""
+    global _flushed
+    with _pending_lock:
+        deltas = dict(_pending)
+        _pending.clear()
+        _flushed = time.monotonic()
+    if not deltas:
+        return
+    try:
+        _write(deltas)
+    except Exception:
+        # Keep the updates for the next flush rather than lose them.
+        with _pending_lock:
+            for key, delta in deltas.items():
+                _pending[key] = _pending.get(key, 0) + delta
+        raise
+
+
+def reset() -> None:
+    """Drops every value, pending or stored. For tests."""
+    with _pending_lock:
+        _pending.clear()
+    _store().clear()
+
+
+def _add(key: str, delta: int) -> None:
+    with _pending_lock:
+        _pending[key] = _pending.get(key, 0) + delta
+        due = time.monotonic() - _flushed >= FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+atexit.register(flush)
+# A forked worker would write the updates of its parent a second time.
+os.register_at_fork(after_in_child=_pending.clear)
+
+
+def incr(name: str, delta: int = 1, **labels: str) -> None:
+    _add(_key(_series(name, labels)), delta)
+
+
+def values(names: Iterable[str]) -> Dict[str, int]:
+    flush()
+    names = list(names)
+    stored = _store().get_many([_key(name) for name in names])
+    return {name: stored.get(_key(name), 0) for name in names}
+
+
+def total(name: str) -> int:
+    """Sum of a counter over all its series."""
+    series = [_series(name, labels) for labels in _registry[name].series()]
+    return sum(values(series).values())
+
+
+def _bucket_keys(series: str, buckets: Tuple[float, ...]) -> List[str]:
+    return [_key(f'{series}:le={le}') for le in (*buckets, '+Inf')]
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Adds `value` (in seconds, for timings) to a histogram."""
+    metric = _registry[name]
+    series = _series(name, labels)
+    bucket = next(
+        (index for index, le in enumerate(metric.buckets) if value <= le),
+        len(metric.buckets),
+    )
+    # Only the bucket of the value is stored; the cumulative counts and
+    # the total are worked out on export.
+    _add(_bucket_keys(series, metric.buckets)[bucket], 1)
+    _add(_key(f'{series}:sum'), round(value * SUM_SCALE))
+
+
+def histogram_values(name: str, **labels: str) -> Tuple[List[int], float]:
+    """Per-bucket counts (the last for ``+Inf``) and the sum."""
+    metric = _registry[name]
+    series = _series(name, labels)
+    keys = [*_bucket_keys(series, metric.buckets), _key(f'{series}:sum')]
+    flush()
+    stored = _store().get_many(keys)
+    counts = [stored.get(key, 0) for key in keys]
+    return counts[:-1], counts[-1] / SUM_SCALE
+
+
+@contextmanager
+def timer(name: str, **labels: str):
+    """Observes the run time of the block in a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def timed(name: str, **labels: str):
+    """Decorator observing the run time of a function in a histogram."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _exported_name(metric: Metric) -> str:
+    return f'{PREFIX}_{metric.name.replace(".", "_")}'
+
+
+def _label_text(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{label}="{value}"' for label, value in sorted(labels.items())
+    )
+    return f'{{{pairs}}}'
+
+
+def _format(number: float) -> str:
+    return repr(float(number)) if isinstance(number, float) else str(number)
+
+
+def exposition() -> str:
+    """All declared metrics in the Prometheus text format."""
+    keys = []
+    for metric in _registry.values():
+        for labels in metric.series():
+            series = _series(metric.name, labels)
+            if metric.kind == 'histogram':
+                keys.extend(_bucket_keys(series, metric.buckets))
+                keys.append(_key(f'{series}:sum'))
+            else:
+                keys.append(_key(series))
+    flush()
+    stored = _store().get_many(keys)
+
+    lines = []
+    for metric in sorted(_registry.values(), key=lambda item: item.name):
+        name = _exported_name(metric)
+        if metric.kind == 'counter':
+            name += '_total'
+        lines.append(f'# HELP {name} {metric.description}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels in metric.series():
+            series = _series(metric.name, labels)
+            if metric.kind != 'histogram':
+                value = stored.get(_key(series), 0)
+                lines.append(f'{name}{_label_text(labels)} {value}')
+                continue
+            cumulative = 0
+            bounds = (*metric.buckets, '+Inf')
+            for le, key in zip(bounds, _bucket_keys(series, metric.buckets)):
+                cumulative += stored.get(key, 0)
+                bucket_labels = {**labels, 'le': _format(le)}
+                lines.append(
+                    f'{name}_bucket{_label_text(bucket_labels)} {cumulative}'
+                )
+            total_sum = stored.get(_key(f'{series}:sum'), 0) / SUM_SCALE
+            lines.append(f'{name}_sum{_label_text(labels)} {total_sum!r}')
+            lines.append(f'{name}_count{_label_text(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
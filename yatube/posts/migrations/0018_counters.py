@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    AuthorCounters = apps.get_model('posts', 'AuthorCounters')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Count = models.Count
+
+    authors = {}
+    posts = Post.objects.exclude(author=None).order_by().values('author')
+    for row in posts.annotate(n=Count('pk')):
+        authors.setdefault(row['author'], {})['posts_count'] = row['n']
+    for row in Follow.objects.values('author').annotate(n=Count('pk')):
+        authors.setdefault(row['author'], {})['followers_count'] = row['n']
+    AuthorCounters.objects.bulk_create(
+        AuthorCounters(user_id=user_id, **values)
+        for user_id, values in authors.items()
+    )
+
+    posts = Post.objects.exclude(group=None).order_by().values('group')
+    for row in posts.annotate(n=Count('pk')):
+        Group.objects.filter(pk=row['group']).update(posts_count=row['n'])
+    for row in Comment.objects.order_by().values('post').annotate(n=Count('pk')):
+        Post.objects.filter(pk=row['post']).update(comments_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0017_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счётчики автора',
+                'verbose_name_plural': 'Счётчики авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
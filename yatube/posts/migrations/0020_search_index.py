@@ -0,0 +1,121 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:00
+
+import re
+from itertools import chain, islice
+
+from django.db import OperationalError, migrations, models, transaction
+import django.db.models.deletion
+
+# The stemmer is imported on purpose: the index must hold the stems that
+# searches look up, so a change to the stemmer needs a migration that
+# rebuilds the index anyway, and a frozen copy here would not match it.
+from posts.stemmer import stem
+
+# As in posts.search when this migration was written. posts.search
+# imports the current models, which a migration must not use.
+FTS_TABLE = 'posts_search'
+MAX_TERM_LENGTH = 64
+BATCH_SIZE = 500
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile('[а-яё]')
+
+
+def terms(text):
+    words = (
+        word for word in WORD.findall(text.lower())
+        if len(word) <= MAX_TERM_LENGTH
+    )
+    return list(dict.fromkeys(
+        stem(word) if CYRILLIC.search(word) else word for word in words
+    ))
+
+
+def create_fts_table(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                    f'USING fts5(body, post_id UNINDEXED)'
+                )
+    except OperationalError:
+        return False
+    return True
+
+
+def fill_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    alias = connection.alias
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+
+    # (post_id, comment_id, text); comment_id is None for the post itself.
+    documents = chain(
+        (
+            (pk, None, text) for pk, text in Post.objects.using(alias)
+            .values_list('pk', 'text').iterator()
+        ),
+        (
+            (post_id, pk, text) for pk, post_id, text in Comment.objects
+            .using(alias).values_list('pk', 'post_id', 'text').iterator()
+        ),
+    )
+    fts = create_fts_table(connection)
+    while True:
+        batch = list(islice(documents, BATCH_SIZE))
+        if not batch:
+            return
+        if not fts:
+            SearchTerm.objects.using(alias).bulk_create(
+                SearchTerm(term=term, post_id=post_id, comment_id=comment_id)
+                for post_id, comment_id, text in batch
+                for term in terms(text)
+            )
+            continue
+        with connection.cursor() as cursor:
+            # Posts and comments share the FTS5 rowid space.
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body, post_id) '
+                f'VALUES (%s, %s, %s)',
+                [
+                    (post_id * 2 if comment_id is None
+                     else comment_id * 2 + 1,
+                     ' '.join(terms(text)), post_id)
+                    for post_id, comment_id, text in batch
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Слова поискового индекса',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ),
+        migrations.RunPython(fill_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+def posts_modified_at_publication(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(modified=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия'),
+        ),
+        migrations.RunPython(
+            posts_modified_at_publication, migrations.RunPython.noop
+        ),
+    ]
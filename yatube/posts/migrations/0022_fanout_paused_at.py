@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def pause_heavy_authors(apps, schema_editor):
+    # Authors over the limit of posts.timeline were served on read so far.
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+    AuthorCounters = apps.get_model('posts', 'AuthorCounters')
+    AuthorCounters.objects.filter(followers_count__gt=limit).update(
+        fanout_paused_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_modified_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorcounters',
+            name='fanout_paused_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Рассылка в ленты приостановлена'),
+        ),
+        migrations.RunPython(pause_heavy_authors, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
-from core.models import CreatedModel
+from core.models import (
+    AtomicSaveModel, CounterFieldsModel, CreatedModel, VersionedModel
+)
 from django.db.models import UniqueConstraint
 
 POSTS_PER_PAGE = 10
@@ -9,7 +11,7 @@ POSTS_PER_PAGE = 10
 User = get_user_model()
 
 
-class Group(models.Model):
+class Group(CounterFieldsModel, VersionedModel):
     title = models.CharField(
         'Название группы',
         help_text='Введите название группы',
@@ -23,6 +25,13 @@ class Group(models.Model):
         'Описание',
         help_text='Укажите описание группы',
     )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+
+    COUNTER_FIELDS = ('posts_count',)
 
     def __str__(self):
         return str(self.title)
@@ -32,17 +41,42 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
-class Post(CreatedModel):
+# Columns that post cards and post pages actually render.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'version',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self) -> 'PostQuerySet':
+        """Posts with their author and group joined in one query."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+class Post(AtomicSaveModel, CounterFieldsModel, VersionedModel,
+           CreatedModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста',
     )
+    # The composite feed indexes below start with author and group.
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
         verbose_name='Автор',
         related_name='posts',
         null=True,
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
@@ -52,6 +86,7 @@ class Post(CreatedModel):
         blank=True,
         null=True,
         help_text='Группа, к которой будет относиться пост',
+        db_index=False,
 
     )
     image = models.ImageField(
@@ -59,6 +94,15 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('comments_count',)
 
     def __str__(self):
         return self.text[:15]
@@ -67,13 +111,29 @@ class Post(CreatedModel):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
+        indexes = (
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        )
 
-class Comment(CreatedModel):
+
+class Comment(AtomicSaveModel, CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         verbose_name='Комментарий',
         related_name='comments',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -90,8 +150,15 @@ class Comment(CreatedModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
+        indexes = (
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx',
+            ),
+        )
+
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -115,3 +182,109 @@ class Follow(models.Model):
                 name='unique_following'
             ),
         )
+
+
+class AuthorCounters(models.Model):
+    """Счётчики автора, обновляемые при записи постов и подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Автор',
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    fanout_paused_at = models.DateTimeField(
+        'Рассылка в ленты приостановлена',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, записанный при публикации (fan-out)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='timeline',
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+        constraints = (
+            UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        )
+
+
+class SearchTerm(models.Model):
+    """
+    Строка обратного индекса поиска: основа слова из поста или
+    комментария. Используется, когда в базе нет FTS5.
+    """
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='+',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        verbose_name='Комментарий',
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Слова поискового индекса'
+
+        indexes = (
+            models.Index(
+                fields=['term', 'post'],
+                name='search_term_post_idx',
+            ),
+        )
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .models import POSTS_PER_PAGE
+
+PAGE_WINDOW = 5
+
+APPROXIMATE_COUNT = getattr(settings, 'PAGINATOR_APPROXIMATE_COUNT', True)
+COUNT_TIMEOUT = getattr(settings, 'PAGINATOR_COUNT_TIMEOUT', 5 * 60)
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(number: int, direction: str, pub_date, pk: int) -> str:
+    """Packs the page number and the ``(pub_date, pk)`` key of a row."""
+    raw = f'{number}|{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[int, str, object, int]]:
+    """Reverse of `encode_cursor`. Returns None for a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        number, direction, pub_date, pk = raw.split('|')
+        number, pk = int(number), int(pk)
+        pub_date = parse_datetime(pub_date)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if number < 1 or direction not in (FORWARD, BACKWARD) or not pub_date:
+        return None
+    return number, direction, pub_date, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset paginator over ``(pub_date, pk)``.
+
+    The tie-breaking column can be replaced with `tiebreak`, e.g. to page
+    through rows that reference posts by their ``post_id``.
+
+    Next/previous pages are read with a range condition on the sort key
+    instead of ``OFFSET``, and no ``COUNT(*)`` is needed to know whether
+    there are more pages. Explicit ``?page=N`` jumps are still served with
+    an offset, also without counting. In approximate mode the total is a
+    cached count that keeps the page-number strip usable; a maintained
+    counter can be passed as `count` instead.
+    """
+
+    def __init__(self, object_list: QuerySet, per_page: int,
+                 approximate: bool = APPROXIMATE_COUNT,
+                 tiebreak: str = 'pk', count: Optional[int] = None):
+        super().__init__(
+            object_list.order_by('-pub_date', f'-{tiebreak}'), per_page
+        )
+        self.approximate = approximate or count is not None
+        self.tiebreak = tiebreak
+        self.known_count = count
+        self.number = 1
+        self.has_next_page = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @cached_property
+    def count(self) -> int:
+        if self.known_count is not None:
+            return self.known_count
+        if not self.approximate:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = 'paginator_count:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(key, self.object_list.count, COUNT_TIMEOUT)
+
+    @property
+    def num_pages(self) -> int:
+        if not self.has_next_page:
+            return self.number
+        known = self.number + 1
+        if not self.approximate:
+            return known
+        return max(super().num_pages, known)
+
+    @property
+    def page_window(self) -> range:
+        """Page numbers around the current one for the navigation strip."""
+        return range(
+            max(1, self.number - PAGE_WINDOW),
+            min(self.num_pages, self.number + PAGE_WINDOW) + 1,
+        )
+
+    def get_page(self, number=None, cursor: Optional[str] = None) -> Page:
+        """
+        Returns a page by cursor, falling back to a page number and then
+        to the first page for invalid or out-of-range input.
+        """
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            return self._cursor_page(*decoded)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        return self.page(number if number >= 1 else 1)
+
+    def page(self, number: int) -> Page:
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            last = super().num_pages if self.approximate else 1
+            return self.page(last if last < number else 1)
+        return self._build_page(rows, number)
+
+    def _cursor_page(self, number: int, direction: str,
+                     pub_date, pk: int) -> Page:
+        if direction == FORWARD:
+            rows = list(self.object_list.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f'{self.tiebreak}__lt': pk})
+            )[:self.per_page + 1])
+            if not rows:
+                return self.page(1)
+            return self._build_page(rows, number)
+
+        rows = list(self.object_list.filter(
+            Q(pub_date__gt=pub_date)
+            | Q(pub_date=pub_date, **{f'{self.tiebreak}__gt': pk})
+        ).order_by('pub_date', self.tiebreak)[:self.per_page + 1])
+        if len(rows) <= self.per_page:
+            # Reached the head of the feed: realign with the first page.
+            return self.page(1)
+        rows = rows[:self.per_page]
+        rows.reverse()
+        self.has_next_page = True
+        return self._finish_page(rows, max(number, 2))
+
+    def _build_page(self, rows: list, number: int) -> Page:
+        self.has_next_page = len(rows) > self.per_page
+        return self._finish_page(rows[:self.per_page], number)
+
+    def _cursor_for(self, number: int, direction: str, obj) -> str:
+        return encode_cursor(
+            number, direction, obj.pub_date, getattr(obj, self.tiebreak)
+        )
+
+    def _finish_page(self, rows: list, number: int) -> Page:
+        self.number = number
+        if rows and self.has_next_page:
+            self.next_cursor = self._cursor_for(number + 1, FORWARD, rows[-1])
+        if rows and number > 1:
+            self.previous_cursor = self._cursor_for(
+                number - 1, BACKWARD, rows[0]
+            )
+        return Page(rows, number, self)
+
+
+def paginate(request: HttpRequest, queryset: QuerySet,
+             per_page: int = POSTS_PER_PAGE, **options) -> Page:
+    """Returns the requested page of a ``pub_date``-ordered queryset."""
+    paginator = CursorPaginator(queryset, per_page, **options)
+    return paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor')
+    )
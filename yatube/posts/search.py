@@ -0,0 +1,187 @@
+"""
+Full-text search over posts and their comments.
+
+Texts are split into words and Russian words are reduced to their
+stems, so «книги» finds «книгами». The stems of every post and comment
+are kept in an inverted index that is updated on save and delete: an
+FTS5 table where SQLite supports it, the `SearchTerm` table otherwise.
+A post matches when each word of the query is found in the post itself
+or in one of its comments.
+"""
+import re
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import (
+    DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+)
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post, PostQuerySet, SearchTerm
+from .stemmer import stem
+
+FTS_TABLE = 'posts_search'
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 500
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile('[а-яё]')
+
+# (post_id, comment_id, text); comment_id is None for the post itself.
+Document = Tuple[int, Optional[int], str]
+
+
+def terms(text: str) -> List[str]:
+    """Distinct index terms of `text` in the order of appearance."""
+    words = (
+        word for word in WORD.findall(text.lower())
+        if len(word) <= MAX_TERM_LENGTH
+    )
+    return list(dict.fromkeys(
+        stem(word) if CYRILLIC.search(word) else word for word in words
+    ))
+
+
+def create_fts_table(connection) -> bool:
+    """Creates the FTS5 table if the database supports it."""
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                    f'USING fts5(body, post_id UNINDEXED)'
+                )
+    except OperationalError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(alias: str, name: str) -> bool:
+    connection = connections[alias]
+    return (connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names())
+
+
+def uses_fts(using: str = DEFAULT_DB_ALIAS) -> bool:
+    return _has_fts_table(using, connections[using].settings_dict['NAME'])
+
+
+def _rowid(post_id: int, comment_id: Optional[int]) -> int:
+    # Posts and comments share the FTS5 rowid space.
+    return post_id * 2 if comment_id is None else comment_id * 2 + 1
+
+
+def _write(documents: Iterable[Document], fts: bool,
+           term_model=SearchTerm, using: str = DEFAULT_DB_ALIAS) -> None:
+    if fts:
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body, post_id) '
+                f'VALUES (%s, %s, %s)',
+                [
+                    (_rowid(post_id, comment_id), ' '.join(terms(text)),
+                     post_id)
+                    for post_id, comment_id, text in documents
+                ],
+            )
+        return
+    term_model.objects.using(using).bulk_create(
+        term_model(term=term, post_id=post_id, comment_id=comment_id)
+        for post_id, comment_id, text in documents
+        for term in terms(text)
+    )
+
+
+def unindex(post_id: int, comment_id: Optional[int] = None,
+            using: str = DEFAULT_DB_ALIAS) -> None:
+    """Drops a post (or one of its comments) from the index."""
+    if uses_fts(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [_rowid(post_id, comment_id)],
+            )
+        return
+    SearchTerm.objects.using(using).filter(
+        post_id=post_id, comment_id=comment_id
+    ).delete()
+
+
+def index(post_id: int, text: str, comment_id: Optional[int] = None,
+          using: str = DEFAULT_DB_ALIAS) -> None:
+    """Indexes the text of a post, or of a comment to it."""
+    unindex(post_id, comment_id, using)
+    _write([(post_id, comment_id, text)], uses_fts(using), using=using)
+
+
+def fill(post_model, comment_model, term_model, fts: bool,
+         using: str = DEFAULT_DB_ALIAS) -> int:
+    """Indexes all posts and comments in batches. Returns their number."""
+    documents = chain(
+        (
+            (pk, None, text) for pk, text in post_model.objects.using(
+                using
+            ).values_list('pk', 'text').iterator()
+        ),
+        (
+            (post_id, pk, text) for pk, post_id, text in comment_model.objects
+            .using(using).values_list('pk', 'post_id', 'text').iterator()
+        ),
+    )
+    total = 0
+    while True:
+        batch = list(islice(documents, BATCH_SIZE))
+        if not batch:
+            return total
+        _write(batch, fts, term_model, using)
+        total += len(batch)
+
+
+def rebuild(using: str = DEFAULT_DB_ALIAS) -> int:
+    """Builds the index from scratch. Returns the number of documents."""
+    fts = uses_fts(using)
+    with transaction.atomic(using=using):
+        if fts:
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            SearchTerm.objects.using(using).all().delete()
+        return fill(Post, Comment, SearchTerm, fts, using)
+
+
+class RawSubquery(RawSQL):
+    """Raw ``SELECT`` for an ``__in`` lookup, which adds the parentheses."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def _matching(term: str, using: str):
+    """Ids of posts whose text or comments contain `term`."""
+    if uses_fts(using):
+        return RawSubquery(
+            f'SELECT post_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [f'"{term}"'],
+        )
+    return SearchTerm.objects.using(using).filter(
+        term=term
+    ).values('post_id')
+
+
+def filter_posts(queryset: PostQuerySet, query: str) -> PostQuerySet:
+    """Narrows `queryset` to posts matching every word of `query`."""
+    query_terms = terms(query)[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return queryset.none()
+    for term in query_terms:
+        queryset = queryset.filter(pk__in=_matching(term, queryset.db))
+    return queryset
+
+
+def search_posts(query: str) -> PostQuerySet:
+    return filter_posts(Post.objects.all(), query)
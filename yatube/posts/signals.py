@@ -0,0 +1,225 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    cards, conditional, counters, feed_cache, metrics, search, thumbnails,
+    timeline, versions,
+)
+from .models import Comment, Follow, Group, Post, User
+
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+metrics.counter('posts.created', 'Posts published.')
+metrics.counter('comments.created', 'Comments added to posts.')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_feeds(sender, instance: Post, **kwargs):
+    if instance.pk is None:
+        return
+    # An edit may move the post to another group: both feeds are stale.
+    instance._previous_feeds = feed_cache.post_feeds(instance.pk)
+    instance._previous_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance: Post, created: bool, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.bump_group(previous_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance: Post, created: bool, **kwargs):
+    if created:
+        # Rolled back posts were never published.
+        transaction.on_commit(lambda: metrics.incr('posts.created'))
+
+
+@receiver(post_save, sender=Post)
+def queue_thumbnail(sender, instance: Post, **kwargs):
+    thumbnails.enqueue(instance)
+
+
+def _author_renamed(created: bool, update_fields) -> bool:
+    # Logins save last_login only and must not drop the author's pages.
+    return not created and not (
+        update_fields and not AUTHOR_CARD_FIELDS & update_fields
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance: User, update_fields=None,
+                      **kwargs):
+    if instance.pk is None or (
+        update_fields and 'username' not in update_fields
+    ):
+        return
+    # The profile of a renamed author is cached under the old name too.
+    instance._previous_username = User.objects.filter(
+        pk=instance.pk
+    ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def expire_author_cards(sender, instance: User, created: bool,
+                        update_fields=None, **kwargs):
+    if _author_renamed(created, update_fields):
+        versions.bump([cards.author_version(instance.pk)])
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance: User, created: bool,
+                            update_fields=None, **kwargs):
+    if _author_renamed(created, update_fields):
+        feeds = feed_cache.author_feeds(instance)
+        previous = getattr(instance, '_previous_username', None)
+        if previous:
+            feeds.append(feed_cache.profile_feed(previous))
+        feed_cache.invalidate(feeds)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance: Group, **kwargs):
+    if instance.pk is None:
+        return
+    instance._previous_slug = Group.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group(sender, instance: Group, created: bool, **kwargs):
+    if created:
+        return
+    feeds = [feed_cache.group_feed(instance.slug)]
+    previous = getattr(instance, '_previous_slug', None)
+    if previous:
+        feeds.append(feed_cache.group_feed(previous))
+    feed_cache.invalidate(feeds)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance: Post, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def push_to_timelines(sender, instance: Post, created: bool, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance: Post, **kwargs):
+    feed_cache.invalidate(
+        getattr(instance, '_previous_feeds', [])
+        + feed_cache.post_feeds(instance.pk)
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def invalidate_deleted_post(sender, instance: Post, **kwargs):
+    feed_cache.invalidate(feed_cache.post_feeds(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance: Comment, created: bool, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance: Comment, created: bool,
+                          **kwargs):
+    if created:
+        transaction.on_commit(lambda: metrics.incr('comments.created'))
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance: Comment, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_commented_post(sender, instance: Comment, created: bool,
+                              **kwargs):
+    if created:
+        feed_cache.invalidate(feed_cache.post_feeds(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_uncommented_post(sender, instance: Comment, **kwargs):
+    feed_cache.invalidate(feed_cache.post_feeds(instance.post_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance: Post, using: str, **kwargs):
+    search.index(instance.pk, instance.text, using=using)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance: Post, using: str, **kwargs):
+    search.unindex(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance: Comment, using: str, **kwargs):
+    search.index(instance.post_id, instance.text, instance.pk, using)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance: Comment, using: str, **kwargs):
+    search.unindex(instance.post_id, instance.pk, using)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance: Follow, **kwargs):
+    counters.bump_author(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def pause_fan_out(sender, instance: Follow, created: bool, **kwargs):
+    # After count_follow: reads the incremented number.
+    if created:
+        timeline.pause_fan_out(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def resume_fan_out(sender, instance: Follow, **kwargs):
+    timeline.schedule_resume(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def expire_follower_pages(sender, instance: Follow, **kwargs):
+    # Follow buttons on the follower's pages change.
+    versions.bump([conditional.viewer_version(instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance: Follow, **kwargs):
+    timeline.prune(instance.user, instance.author)
@@ -0,0 +1,126 @@
+"""
+Russian Snowball stemmer.
+
+A port of the Snowball algorithm for Russian:
+https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple
+
+VOWELS = frozenset('аеиоуыэюя')
+
+Suffixes = Sequence[Tuple[str, bool]]
+
+
+def _suffixes(after_a: Iterable[str] = (), plain: Iterable[str] = ()):
+    """Longest first; ``True`` marks endings that must follow а or я."""
+    return sorted(
+        [(ending, True) for ending in after_a]
+        + [(ending, False) for ending in plain],
+        key=lambda suffix: -len(suffix[0]),
+    )
+
+
+PERFECTIVE_GERUND = _suffixes(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = _suffixes(plain=(
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = _suffixes(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = _suffixes(plain=('ся', 'сь'))
+VERB = _suffixes(
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = _suffixes(plain=(
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+))
+SUPERLATIVE = _suffixes(plain=('ейш', 'ейше'))
+DERIVATIONAL = _suffixes(plain=('ост', 'ость'))
+
+
+def _strip(word: str, suffixes: Suffixes) -> Optional[str]:
+    """`word` without its longest ending from `suffixes`, or None."""
+    for ending, after_a in suffixes:
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if after_a and not stem.endswith(('а', 'я')):
+                return None
+            return stem
+    return None
+
+
+def _region(word: str, start: int) -> int:
+    """Start of the region after the first vowel-consonant pair."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _step1(rv: str) -> str:
+    """Drops the gerund, or the reflexive and inflectional endings."""
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    adjective = _strip(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _strip(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for suffixes in (VERB, NOUN):
+        stripped = _strip(rv, suffixes)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def _step4(rv: str) -> str:
+    """Undoubles н, or drops a superlative ending or a soft sign."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    superlative = _strip(rv, SUPERLATIVE)
+    if superlative is not None:
+        if superlative.endswith('нн'):
+            return superlative[:-1]
+        return superlative
+    if rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+# Word frequencies follow a power law: a small cache covers most words.
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Stem of a lowercase Russian `word`."""
+    word = word.replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+    r2_start = _region(word, _region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv = _step1(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    derivational = _strip(rv, DERIVATIONAL)
+    if derivational is not None and rv_start + len(derivational) >= r2_start:
+        rv = derivational
+
+    return prefix + _step4(rv)
@@ -0,0 +1,17 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """
+    Ready image variants of the post (``src``, ``srcset``,
+    ``webp_srcset``, ``sizes``), or None while a worker renders them.
+    """
+    variants = thumbnails.thumbnail_variants(post.image.name)
+    if variants is None:
+        thumbnails.enqueue(post)
+    return variants
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..management.commands.benchmark_views import Command
+
+ROUTES = {
+    'index', 'group_list', 'profile', 'post_detail', 'follow_index',
+    'search', 'post_create', 'post_edit', 'add_comment', 'profile_follow',
+    'profile_unfollow',
+}
+
+
+def result(p95_ms: float, queries: int) -> dict:
+    return {'sizes': {'100': {'index': {
+        'p95_ms': p95_ms, 'queries': queries,
+    }}}}
+
+
+class BenchmarkViewsTest(TestCase):
+    def setUp(self):
+        call_command(
+            'seed_data', users=20, groups=2, posts=50, comments=50,
+            follows=40, stdout=StringIO(),
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'benchmark.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, **options) -> str:
+        out = StringIO()
+        call_command(
+            'benchmark_views', use_current_database=True, requests=3,
+            output=self.output, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_measures_every_route(self):
+        self.benchmark()
+
+        with open(self.output) as output:
+            report = json.load(output)
+        routes = report['sizes']['50']
+        self.assertEqual(set(routes), ROUTES)
+        for route in routes.values():
+            self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+            self.assertGreater(route['peak_kib'], 0)
+        self.assertGreater(routes['index']['queries'], 0)
+
+    def test_regressions(self):
+        command = Command()
+
+        self.assertEqual(
+            command.compare(result(10, 3), result(12, 3), 1.25), []
+        )
+        self.assertEqual(
+            len(command.compare(result(10, 3), result(13, 4), 1.25)), 2
+        )
+
+    def test_compare_fails_on_regression(self):
+        baseline = os.path.join(self.directory.name, 'baseline.json')
+        with open(baseline, 'w') as output:
+            json.dump({'sizes': {'50': {'index': {
+                'p95_ms': 1000.0, 'queries': 0,
+            }}}}, output)
+
+        with self.assertRaisesMessage(CommandError, 'queries 0 ->'):
+            self.benchmark(compare=baseline)
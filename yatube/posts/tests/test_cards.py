@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from ..models import User, Post, Group
+from .utlis import URLS
+
+
+class PostCardCacheTest(TestCase):
+    author: User
+    group: Group
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='carded', first_name='Старое', last_name='Имя',
+        )
+        cls.group = Group.objects.create(
+            title='Карточки', slug='cards', description='Описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.author, group=self.group,
+        )
+        self.urls = (
+            URLS['group_list']({'slug': self.group.slug}),
+            URLS['profile']({'username': self.author.username}),
+        )
+
+    def get_pages(self):
+        return [self.client.get(url).content.decode() for url in self.urls]
+
+    def test_cards_are_served_from_cache(self):
+        self.get_pages()
+        # update() bypasses signals: cached cards keep the old text.
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for content in self.get_pages():
+            self.assertIn('Исходный текст', content)
+
+    def test_post_edit_renders_card_again(self):
+        self.get_pages()
+        self.post.text = 'Отредактированный текст'
+        self.post.save()
+        for content in self.get_pages():
+            self.assertIn('Отредактированный текст', content)
+
+    def test_author_rename_renders_cards_again(self):
+        self.get_pages()
+        self.author.last_login = None
+        self.author.save(update_fields=['last_login'])
+        self.author.first_name = 'Новое'
+        self.author.save()
+        for content in self.get_pages():
+            self.assertIn('Новое Имя', content)
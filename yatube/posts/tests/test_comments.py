@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import views
+from ..models import Comment, Post, User
+from .utlis import URLS
+
+PER_PAGE = 3
+
+
+@mock.patch.object(views, 'COMMENTS_PER_PAGE', PER_PAGE)
+class CommentPaginationTest(TestCase):
+    post: Post
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Вирусный пост', author=author)
+        for i in range(PER_PAGE * 2 + 1):
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_first_page_on_post_detail(self):
+        response = self.client.get(
+            URLS['post_detail']({'post_id': self.post.pk})
+        )
+
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Комментарий 6', 'Комментарий 5', 'Комментарий 4'],
+        )
+        self.assertContains(response, 'Комментарии: 7')
+        self.assertContains(response, 'id="more-comments"')
+
+    def test_further_pages(self):
+        url = URLS['comments']({'post_id': self.post.pk})
+        first = self.client.get(
+            URLS['post_detail']({'post_id': self.post.pk})
+        )
+        cursor = first.context['comments'].paginator.next_cursor
+
+        texts = []
+        while cursor:
+            page = self.client.get(url, {'cursor': cursor}).json()
+            texts.extend(
+                line.strip() for line in page['html'].splitlines()
+                if line.strip().startswith('Комментарий')
+            )
+            cursor = page['cursor']
+            self.assertEqual(page['count'], 7)
+
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(3, -1, -1)])
+
+    def test_count_comes_from_counter(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(URLS['post_detail']({'post_id': self.post.pk}))
+
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+
+    def test_new_comment_changes_fragment(self):
+        url = URLS['comments']({'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        Comment.objects.create(
+            post=self.post, author=self.post.author, text='Новый'
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый', response.json()['html'])
+
+    def test_deleted_comment_changes_fragment(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.post.author, text='Удалённый'
+        )
+        url = URLS['comments']({'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+
+        comment.delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Удалённый', response.json()['html'])
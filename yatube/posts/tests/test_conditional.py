@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from .. import conditional
+from ..models import Comment, Follow, Group, Post, User
+from .utlis import URLS
+
+
+class ConditionalGetTest(TestCase):
+    author: User
+    group: Group
+    post: Post
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='validated')
+        cls.group = Group.objects.create(
+            title='Условные запросы', slug='conditional', description='-',
+        )
+        cls.post = Post.objects.create(
+            text='Проверяемый пост', author=cls.author, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = (
+            URLS['index'](),
+            URLS['group_list']({'slug': self.group.slug}),
+            URLS['profile']({'username': self.author.username}),
+            URLS['post_detail']({'post_id': self.post.pk}),
+        )
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        # Pages about a group or a post read its version and edit time.
+        lookups = (0, 1, 0, 1)
+        for url, queries in zip(self.urls, lookups):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.has_header('Last-Modified'))
+                stats = conditional.stats()
+                with self.assertNumQueries(queries):
+                    again = self.revalidate(self.guest_client, url, response)
+                self.assertEqual(again.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(
+                    conditional.stats()['not_modified'],
+                    stats['not_modified'] + 1,
+                )
+                since = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(since.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_writes_change_validators(self):
+        responses = {url: self.guest_client.get(url) for url in self.urls}
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group,
+        )
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                again = self.revalidate(self.guest_client, url, response)
+                self.assertEqual(again.status_code, HTTPStatus.OK)
+
+        url = URLS['post_detail']({'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий',
+        )
+        again = self.revalidate(self.guest_client, url, response)
+        self.assertContains(again, 'Новый комментарий')
+
+    def test_edits_change_validators(self):
+        url = URLS['post_detail']({'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        # update() skips the feeds; only the version column can tell.
+        Post.objects.filter(pk=self.post.pk).update(version=2)
+        self.assertEqual(
+            self.revalidate(self.guest_client, url, response).status_code,
+            HTTPStatus.OK,
+        )
+
+        group_url = URLS['group_list']({'slug': self.group.slug})
+        response = self.guest_client.get(group_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.description = 'Новое описание'
+        group.save(update_fields=['description'])
+        self.assertEqual(group.version, 2)
+        again = self.revalidate(self.guest_client, group_url, response)
+        self.assertContains(again, 'Новое описание')
+        self.assertGreater(group.modified, self.group.modified)
+
+    def test_validators_depend_on_viewer(self):
+        follower = User.objects.create_user(username='viewer')
+        client = Client()
+        client.force_login(follower)
+        url = URLS['profile']({'username': self.author.username})
+
+        response = client.get(url)
+        guest = self.guest_client.get(url)
+        self.assertNotEqual(response['ETag'], guest['ETag'])
+        self.assertEqual(
+            self.revalidate(client, url, response).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+        Follow.objects.create(user=follower, author=self.author)
+        self.assertContains(
+            self.revalidate(client, url, response), 'Отписаться'
+        )
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import User, Post, Group, Comment, Follow
+
+
+class CountersTest(TestCase):
+    author: User
+    reader: User
+    group: Group
+    another_group: Group
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Первая', slug='first', description='Описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Вторая', slug='second', description='Описание',
+        )
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group,
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        author = counters.author_counters(self.author.pk)
+        self.assertEqual(author.posts_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        post.group = self.another_group
+        post.save()
+        self.group.refresh_from_db()
+        self.another_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.another_group.posts_count, 1)
+
+        post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        author = counters.author_counters(self.author.pk)
+        self.assertEqual(author.posts_count, 0)
+        self.assertEqual(author.followers_count, 0)
+        self.another_group.refresh_from_db()
+        self.assertEqual(self.another_group.posts_count, 0)
+
+    def test_saves_keep_concurrent_increments(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group,
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        # Another request counts a comment and a post after the load.
+        counters.bump_post(post.pk, 1)
+        counters.bump_group(self.group.pk, 1)
+
+        post.text = 'Исправленный пост'
+        post.save()
+        group.title = 'Новое название'
+        group.save()
+
+        post.refresh_from_db()
+        group.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(group.title, 'Новое название')
+        self.assertEqual(group.posts_count, 2)
+
+    def test_author_with_followers_and_posts_can_be_deleted(self):
+        author = User.objects.create_user(username='leaving')
+        Post.objects.create(text='Пост', author=author, group=self.group)
+        Follow.objects.create(user=self.reader, author=author)
+
+        author.delete()
+
+        self.assertFalse(User.objects.filter(username='leaving').exists())
+        self.assertFalse(
+            counters.AuthorCounters.objects.filter(user_id=author.pk).exists()
+        )
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        # bulk_create skips signals, so the counters fall behind.
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author, group=self.group)
+            for i in range(3)
+        )
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        self.assertIn(f'  {self.author.pk}: 0 -> 3', out.getvalue())
+        self.assertEqual(
+            counters.author_counters(self.author.pk).posts_count, 0
+        )
+
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            counters.author_counters(self.author.pk).posts_count, 3
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertFalse(any(counters.rebuild(dry_run=True).values()))
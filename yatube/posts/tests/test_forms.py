@@ -1,11 +1,15 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from http import HTTPStatus
+from PIL import Image
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 
+from .. import uploads
 from ..models import Post, User, Comment
 from .utlis import URLS
 
@@ -103,6 +107,59 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(text='Изменяем текст поста').exists()
         )
 
+    def create_with_image(self, content, name='image.png'):
+        return self.authorized_client.post(
+            URLS['post_create'](),
+            data={
+                'text': 'Пост с большой картинкой',
+                'image': SimpleUploadedFile(
+                    name=name, content=content, content_type='image/png'
+                ),
+            },
+        )
+
+    def test_oversized_upload_is_rejected(self):
+        with mock.patch.object(uploads, 'MAX_SIZE', 16):
+            response = self.create_with_image(
+                PostCreateFormTests.small_gif, name='small.gif'
+            )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл слишком большой: максимум 0 МБ.'
+        )
+        self.assertContains(response, 'Файл слишком большой')
+        # The fields sent before the file survive the stopped upload.
+        self.assertContains(response, 'Пост с большой картинкой')
+        self.assertFalse(
+            Post.objects.filter(text='Пост с большой картинкой').exists()
+        )
+
+    def test_too_many_pixels_are_rejected(self):
+        with mock.patch.object(uploads, 'MAX_PIXELS', 1):
+            response = self.create_with_image(
+                PostCreateFormTests.small_gif, name='small.gif'
+            )
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое изображение: 2×1 пикселей.'
+        )
+
+    def test_huge_image_is_downscaled(self):
+        buffer = BytesIO()
+        Image.new('RGB', (100, 50)).save(buffer, 'PNG')
+        with mock.patch.object(uploads, 'MAX_SIDE', 40):
+            self.create_with_image(buffer.getvalue())
+        post = Post.objects.get(text='Пост с большой картинкой')
+        self.assertEqual((post.image.width, post.image.height), (40, 20))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_huge_upload_on_disk_is_downscaled(self):
+        buffer = BytesIO()
+        Image.new('RGB', (100, 50)).save(buffer, 'PNG')
+        with mock.patch.object(uploads, 'MAX_SIDE', 40):
+            self.create_with_image(buffer.getvalue())
+        post = Post.objects.get(text='Пост с большой картинкой')
+        self.assertEqual((post.image.width, post.image.height), (40, 20))
+
     def test_not_create_post(self):
         # Guest.
         posts_count = Post.objects.count()
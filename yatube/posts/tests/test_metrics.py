@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import Client, TestCase
+
+from .. import metrics, signals
+from ..models import Comment, Post, User
+from .utlis import URLS, metrics_in_memory
+
+
+def sample(text: str, line: str) -> float:
+    """Value of the exposition line starting with `line`."""
+    for row in text.splitlines():
+        if row.startswith(line + ' '):
+            return float(row.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line} is not exported')
+
+
+@metrics_in_memory
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='reader')
+        self.client = Client()
+
+    def export(self) -> str:
+        response = self.client.get(URLS['metrics']())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_only_staff_and_internal_callers(self):
+        outside = {'REMOTE_ADDR': '203.0.113.7'}
+        response = self.client.get(URLS['metrics'](), **outside)
+        self.assertEqual(response.status_code, 403)
+
+        staff = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(URLS['metrics'](), **outside)
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_outlive_the_default_cache(self):
+        metrics.incr('posts.created')
+        cache.clear()
+
+        self.assertEqual(metrics.total('posts.created'), 1)
+
+    def test_updates_are_written_in_batches(self):
+        store = caches[metrics.CACHE]
+        key = metrics._key('posts.created')
+        with mock.patch.object(metrics, 'FLUSH_INTERVAL', 60), \
+                mock.patch.object(metrics, '_write',
+                                  wraps=metrics._write) as write:
+            for _ in range(5):
+                metrics.incr('posts.created')
+            self.assertIsNone(store.get(key))
+
+            self.assertEqual(metrics.total('posts.created'), 5)
+            write.assert_called_once()
+        self.assertEqual(store.get(key), 5)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.histogram('test.seconds', 'Test.', buckets=(1, 5))
+        self.addCleanup(metrics._registry.pop, 'test.seconds')
+        for value in (0.5, 3, 3, 10):
+            metrics.observe('test.seconds', value)
+
+        self.assertEqual(
+            metrics.histogram_values('test.seconds'), ([1, 2, 1], 16.5)
+        )
+        text = metrics.exposition()
+        self.assertIn('# TYPE yatube_test_seconds histogram', text)
+        self.assertEqual(sample(text, 'yatube_test_seconds_bucket{le="1"}'), 1)
+        self.assertEqual(sample(text, 'yatube_test_seconds_bucket{le="5"}'), 3)
+        self.assertEqual(
+            sample(text, 'yatube_test_seconds_bucket{le="+Inf"}'), 4
+        )
+        self.assertEqual(sample(text, 'yatube_test_seconds_count'), 4)
+        self.assertEqual(sample(text, 'yatube_test_seconds_sum'), 16.5)
+
+    def test_feed_cache_hits_by_feed(self):
+        self.client.get(URLS['index']())
+        self.client.get(URLS['index']())
+
+        text = self.export()
+        self.assertEqual(
+            sample(text, 'yatube_feed_cache_misses_total{feed="index"}'), 1
+        )
+        self.assertEqual(
+            sample(text, 'yatube_feed_cache_hits_total{feed="index"}'), 1
+        )
+        self.assertEqual(
+            sample(text, 'yatube_feed_cache_hits_total{feed="group"}'), 0
+        )
+
+    def test_view_latency(self):
+        self.client.get(URLS['index']())
+        self.client.get(URLS['search']())
+
+        text = self.export()
+        for view in ('index', 'search'):
+            self.assertEqual(
+                sample(
+                    text,
+                    f'yatube_views_duration_seconds_count{{view="{view}"}}',
+                ),
+                1,
+            )
+
+    def test_created_posts_and_comments(self):
+        # Test transactions never commit: run the callbacks right away.
+        with mock.patch.object(
+            signals.transaction, 'on_commit', side_effect=lambda run: run()
+        ):
+            post = Post.objects.create(text='Пост', author=self.user)
+            post.save()
+            Comment.objects.create(post=post, author=self.user, text='Ответ')
+
+        text = self.export()
+        self.assertEqual(sample(text, 'yatube_posts_created_total'), 1)
+        self.assertEqual(sample(text, 'yatube_comments_created_total'), 1)
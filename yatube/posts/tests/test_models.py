@@ -1,3 +1,4 @@
+from django.db.models.signals import post_save
 from django.test import TestCase
 
 from ..models import Group, Post, User, Comment, Follow
@@ -106,3 +107,54 @@ class PostModelTest(TestCase):
                         model._meta.get_field(field).help_text,
                         expected_help_text,
                     )
+
+    def test_saves_bump_version_and_modified(self):
+        """Testing that every save of a post counts as a new version."""
+        post = Post.objects.create(author=PostModelTest.user, text='Версия')
+        self.assertEqual(post.version, 1)
+        created = post.modified
+
+        post.text = 'Вторая версия'
+        post.save()
+        self.assertEqual(post.version, 2)
+        post.save(update_fields=['text'])
+        self.assertEqual(post.version, 3)
+
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+        self.assertGreater(post.modified, created)
+
+    def test_post_save_receivers_see_the_new_version(self):
+        """Testing that post_save gets the saved number, not F()."""
+        post = Post.objects.create(author=PostModelTest.user, text='Версия')
+        seen = []
+
+        def receiver(sender, instance, **kwargs):
+            seen.append(instance.version)
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        post.save()
+        self.assertEqual(seen, [2])
+
+    def test_empty_update_fields_saves_nothing(self):
+        """Testing that save(update_fields=[]) stays a no-op."""
+        post = Post.objects.create(author=PostModelTest.user, text='Версия')
+        post.save(update_fields=[])
+        post.refresh_from_db()
+        self.assertEqual(post.version, 1)
+
+    def test_deferred_saves_bump_modified(self):
+        """Testing that saving a feed post also updates modified."""
+        post = Post.objects.create(author=PostModelTest.user, text='Версия')
+        group = Group.objects.create(title='Группа', slug='deferred')
+        for instance in (
+            Post.objects.for_feed().get(pk=post.pk),
+            Group.objects.only('title').get(pk=group.pk),
+        ):
+            with self.subTest(model=type(instance).__name__):
+                previous = type(instance).objects.get(pk=instance.pk)
+                instance.save()
+                instance.refresh_from_db()
+                self.assertEqual(instance.version, previous.version + 1)
+                self.assertGreater(instance.modified, previous.modified)
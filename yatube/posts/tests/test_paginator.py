@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from ..models import User, Post, POSTS_PER_PAGE
+from ..paginator import CursorPaginator, decode_cursor
+from .utlis import URLS
+
+
+class CursorPaginatorTest(TestCase):
+    POSTS_COUNT = 25
+
+    user: User
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='paginated')
+        Post.objects.bulk_create((
+            Post(text=f'Пост номер {i}', author=cls.user)
+            for i in range(cls.POSTS_COUNT)
+        ))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_cursors_walk_whole_feed(self):
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        seen = []
+        cursor = None
+        number = 0
+        while True:
+            paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+            page = paginator.get_page(cursor=cursor)
+            number += 1
+            self.assertEqual(page.number, number)
+            seen.extend(page.object_list)
+            if not page.has_next():
+                break
+            cursor = paginator.next_cursor
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_same_page(self):
+        first = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        first_page = first.get_page()
+        second = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        second.get_page(cursor=first.next_cursor)
+        back = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        back_page = back.get_page(cursor=second.previous_cursor)
+        self.assertEqual(back_page.number, 1)
+        self.assertEqual(back_page.object_list, first_page.object_list)
+        self.assertFalse(back_page.has_previous())
+
+    def test_exact_mode_does_not_count(self):
+        paginator = CursorPaginator(
+            Post.objects.all(), POSTS_PER_PAGE, approximate=False
+        )
+        with self.assertNumQueries(1):
+            page = paginator.get_page(2)
+            self.assertTrue(page.has_next())
+            self.assertEqual(list(paginator.page_window), [1, 2, 3])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        response = self.client.get(
+            URLS['index'](), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_view_next_link_uses_cursor(self):
+        response = self.client.get(
+            URLS['profile']({'username': self.user.username})
+        )
+        paginator = response.context['page_obj'].paginator
+        self.assertContains(response, f'?cursor={paginator.next_cursor}')
+        response = self.client.get(
+            URLS['profile']({'username': self.user.username}),
+            {'cursor': paginator.next_cursor},
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), POSTS_PER_PAGE)
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import User, Post, Group, Comment, Follow, POSTS_PER_PAGE
+from .utlis import URLS
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Every page must stay within a fixed number of queries, no matter
+    how many posts, comments or authors it shows.
+    """
+    BUDGETS = {
+        'index': 4,
+        'group_list': 5,
+        'profile': 6,
+        'post_detail': 5,
+        'follow_index': 5,
+    }
+
+    follower: User
+    group: Group
+    post: Post
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа для подсчёта запросов',
+            slug='queries',
+            description='Описание',
+        )
+        cls.follower = User.objects.create_user(username='counter')
+        for i in range(POSTS_PER_PAGE + 2):
+            author = User.objects.create_user(
+                username=f'author_{i}', first_name='Имя', last_name='Автор',
+            )
+            Follow.objects.create(user=cls.follower, author=author)
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=cls.group,
+            )
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {i}',
+            )
+        for i in range(POSTS_PER_PAGE):
+            commenter = User.objects.create_user(username=f'commenter_{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text='Ещё комментарий',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTest.follower)
+
+    def test_pages_stay_within_query_budget(self):
+        urls = {
+            'index': URLS['index'](),
+            'group_list': URLS['group_list']({'slug': self.group.slug}),
+            'profile': URLS['profile'](
+                {'username': self.post.author.username}
+            ),
+            'post_detail': URLS['post_detail']({'post_id': self.post.pk}),
+            'follow_index': URLS['follow_index'](),
+        }
+        for name, url in urls.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), self.BUDGETS[name],
+                    '\n'.join(query['sql'] for query in queries),
+                )
+
+    @override_settings(QUERY_INSPECTION='raise', SLOW_QUERY_MS=1000)
+    def test_pages_have_no_repeated_queries(self):
+        urls = [
+            URLS['index'](),
+            URLS['group_list']({'slug': self.group.slug}),
+            URLS['profile']({'username': self.post.author.username}),
+            URLS['post_detail']({'post_id': self.post.pk}),
+            URLS['follow_index'](),
+            f'{URLS["search"]()}?q=Пост',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertNotIn('FULL SCAN', out.getvalue())
+        self.assertNotIn('SORT', out.getvalue())
@@ -0,0 +1,133 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+
+from .. import search
+from ..models import Comment, Group, Post, SearchTerm, User
+from ..stemmer import stem
+from .utlis import URLS
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_a_stem(self):
+        cases = (
+            ('книги', 'книгами', 'книг'),
+            ('бегущий', 'бегущая', 'бегущ'),
+            ('законность', 'законный', 'закон'),
+            ('ёлки', 'елками', 'елк'),
+        )
+        for first, second, expected in cases:
+            with self.subTest(word=first):
+                self.assertEqual(stem(first), expected)
+                self.assertEqual(stem(second), expected)
+
+    def test_terms(self):
+        self.assertEqual(
+            search.terms('Книги, книгами и Django!'),
+            ['книг', 'и', 'django'],
+        )
+
+
+class SearchTest(TestCase):
+    author: User
+    group: Group
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='searcher')
+        cls.group = Group.objects.create(
+            title='Поиск', slug='search', description='Описание',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.post = Post.objects.create(
+            text='Читаю интересные книги о путешествиях',
+            author=self.author,
+            group=self.group,
+        )
+        self.other = Post.objects.create(
+            text='Сегодня хорошая погода', author=self.author,
+        )
+
+    def found(self, query):
+        return list(search.search_posts(query).order_by('pk'))
+
+    def assert_found(self, query, *posts):
+        self.assertEqual(self.found(query), list(posts))
+
+    def test_search_matches_word_forms(self):
+        self.assert_found('книгами', self.post)
+        self.assert_found('Интересная книга', self.post)
+        self.assert_found('погоду', self.other)
+        self.assert_found('книга погода')
+        self.assert_found('')
+
+    def test_search_matches_comments(self):
+        Comment.objects.create(
+            post=self.other, author=self.author, text='Отличные книги!'
+        )
+        self.assert_found('книги', self.post, self.other)
+        self.assert_found('погода отличная', self.other)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.post.text = 'Теперь про кино'
+        self.post.save()
+        self.assert_found('книги')
+        self.assert_found('кино', self.post)
+
+        comment = Comment.objects.create(
+            post=self.other, author=self.author, text='Смотрел кино'
+        )
+        self.assert_found('кино', self.post, self.other)
+        comment.delete()
+        self.assert_found('кино', self.post)
+        self.post.delete()
+        self.assert_found('кино')
+
+    def test_term_table_fallback(self):
+        with mock.patch.object(search, 'uses_fts', return_value=False):
+            call_command('rebuild_search_index', stdout=StringIO())
+            self.assertTrue(SearchTerm.objects.filter(term='книг').exists())
+            self.assert_found('книгами', self.post)
+
+            Comment.objects.create(
+                post=self.other, author=self.author, text='Отличные книги!'
+            )
+            self.assert_found('книги', self.post, self.other)
+            self.post.delete()
+            self.assert_found('книги', self.other)
+
+    def test_rebuild_command(self):
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        self.assert_found('книги', self.post)
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 2', out.getvalue())
+        self.assert_found('книги')
+        self.assert_found('правка', self.post)
+
+    def test_search_page(self):
+        Post.objects.bulk_create(
+            Post(text=f'Книга номер {i}', author=self.author)
+            for i in range(12)
+        )
+        search.rebuild()
+        response = self.client.get(URLS['search'](), {'q': 'книги'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, '?q=%D0%BA%D0%BD%D0%B8%D0%B3%D0%B8&amp;')
+
+        next_page = self.client.get(URLS['search'](), {
+            'q': 'книги', 'cursor': page_obj.paginator.next_cursor,
+        })
+        self.assertEqual(len(next_page.context['page_obj']), 3)
+
+    def test_empty_search_page(self):
+        response = self.client.get(URLS['search']())
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.client.get(URLS['search'](), {'q': 'сапоги'})
+        self.assertContains(response, 'ничего не найдено')
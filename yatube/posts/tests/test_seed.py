@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from .. import counters, search
+from ..management.commands.seed_data import END
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..timeline import FANOUT_LIMIT
+
+SIZES = {
+    'users': 50, 'groups': 5, 'posts': 300, 'comments': 400,
+    'follows': 200, 'days': 30,
+}
+
+
+def seed(prefix: str, **options) -> str:
+    out = StringIO()
+    call_command(
+        'seed_data', prefix=prefix, stdout=out, **{**SIZES, **options}
+    )
+    return out.getvalue()
+
+
+def snapshot(prefix: str) -> list:
+    """Seeded posts with ids made relative to the first seeded rows."""
+    users = User.objects.filter(username__startswith=prefix)
+    first_user = min(users.values_list('pk', flat=True))
+    posts = Post.objects.filter(author__in=users).order_by('pk')
+    first_post = posts.first().pk
+    return [
+        (pk - first_post, text, pub_date, author - first_user, count)
+        for pk, text, pub_date, author, count in posts.values_list(
+            'pk', 'text', 'pub_date', 'author', 'comments_count'
+        )
+    ]
+
+
+class SeedDataTest(TestCase):
+    def test_seeds_consistent_rows(self):
+        out = seed('seed')
+
+        self.assertIn('posts: 300', out)
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+        self.assertFalse(any(counters.rebuild(dry_run=True).values()))
+        self.assertGreaterEqual(Post.objects.earliest('pub_date').pub_date,
+                                END - timedelta(days=30))
+        self.assertLessEqual(Post.objects.latest('pub_date').pub_date, END)
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(search.search_posts(word).exists())
+
+    def test_timelines_match_fan_out(self):
+        seed('seed')
+        follow = Follow.objects.filter(
+            author__counters__followers_count__lte=FANOUT_LIMIT,
+            author__posts__isnull=False,
+        ).first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count(),
+        )
+
+    def test_same_seed_same_rows(self):
+        seed('first', seed=7, skip_search_index=True)
+        seed('second', seed=7, skip_search_index=True)
+        seed('third', seed=8, skip_search_index=True)
+
+        self.assertEqual(snapshot('first'), snapshot('second'))
+        self.assertNotEqual(snapshot('first'), snapshot('third'))
+
+    def test_new_rows_get_fresh_ids(self):
+        seed('seed', skip_search_index=True)
+        user = User.objects.create_user(username='after')
+        group = Group.objects.create(title='Г', slug='after', description='О')
+        post = Post.objects.create(text='Пост', author=user, group=group)
+
+        self.assertGreater(post.pk, 300)
+        self.assertGreater(user.pk, 50)
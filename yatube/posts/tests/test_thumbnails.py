@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+
+from .. import metrics, thumbnails
+from ..models import Post, User
+from .utlis import URLS, metrics_in_memory
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@metrics_in_memory
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    user: User
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = Client()
+        image = SimpleUploadedFile(
+            name='small.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'
+            ),
+            content_type='image/gif'
+        )
+        with mock.patch.object(thumbnails, 'render_variants') as render:
+            self.post = Post.objects.create(
+                text='Пост с картинкой', author=self.user, image=image,
+            )
+        # The worker runs after commit, which a TestCase never reaches.
+        render.assert_not_called()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        url = URLS['profile']({'username': self.user.username})
+        self.assertEqual(thumbnails.stats()['backlog'], 1)
+        response = self.client.get(url)
+        self.assertContains(response, 'bg-light')
+        self.assertNotContains(response, '<img class="card-img')
+
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        variants = thumbnails.thumbnail_variants(self.post.image.name)
+        self.assertIsNotNone(variants)
+        for width in thumbnails.WIDTHS:
+            with self.subTest(width=width):
+                self.assertIn(f'/{width}.jpg {width}w', variants['srcset'])
+                self.assertIn(
+                    f'/{width}.webp {width}w', variants['webp_srcset']
+                )
+
+        response = self.client.get(url)
+        self.assertContains(response, f'src="{variants["src"]}"')
+        self.assertContains(response, 'type="image/webp"')
+        stats = thumbnails.stats()
+        self.assertEqual(stats['backlog'], 0)
+        self.assertEqual(stats['processed'], 1)
+
+    def test_variants_rendered_elsewhere_are_found(self):
+        name = self.post.image.name
+        self.assertIsNone(thumbnails.stored_variants(name))
+        # As generate_image_variants does in another process.
+        variants = thumbnails.render_variants(name)
+        cache.clear()
+
+        self.assertEqual(thumbnails.stored_variants(name), variants)
+        self.assertEqual(thumbnails.thumbnail_variants(name), variants)
+
+    def test_post_is_queued_once(self):
+        with mock.patch.object(thumbnails.transaction, 'on_commit') as queue:
+            thumbnails.enqueue(self.post)
+            self.client.get(URLS['post_detail']({'post_id': self.post.pk}))
+        queue.assert_not_called()
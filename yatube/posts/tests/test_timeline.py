@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.test import Client, TestCase
+
+from .. import timeline
+from ..models import User, Post, Follow, TimelineEntry
+from .utlis import URLS
+
+
+class TimelineTest(TestCase):
+    author: User
+    follower: User
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.follower = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(TimelineTest.follower)
+
+    def feed(self):
+        response = self.follower_client.get(URLS['follow_index']())
+        return response.context['page_obj'].object_list
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post, pub_date=post.pub_date
+        ).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        posts = [
+            Post.objects.create(text=f'Старый пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.follower_client.get(
+            URLS['profile_follow']({'username': self.author.username})
+        )
+        self.assertEqual(self.feed(), posts[::-1])
+
+        self.follower_client.get(
+            URLS['profile_unfollow']({'username': self.author.username})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    def test_heavy_author_is_merged_on_read(self):
+        other = User.objects.create_user(username='light')
+        Follow.objects.create(user=self.follower, author=other)
+        light_post = Post.objects.create(text='Лёгкий', author=other)
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 1):
+            Follow.objects.create(user=other, author=self.author)
+            Follow.objects.create(user=self.follower, author=self.author)
+            heavy_post = Post.objects.create(
+                text='Тяжёлый', author=self.author
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=heavy_post).exists()
+            )
+            self.assertEqual(self.feed(), [heavy_post, light_post])
+
+    def follow(self, *users):
+        for user in users:
+            Follow.objects.create(user=user, author=self.author)
+
+    def unfollow(self, user):
+        Follow.objects.filter(user=user, author=self.author).delete()
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 2)
+    @mock.patch.object(timeline, 'FANOUT_RESUME', 1)
+    @mock.patch.object(timeline, 'WORKERS', 0)
+    def test_fan_out_resumes_below_the_limit_with_missing_posts(self):
+        others = [
+            User.objects.create_user(username=f'other_{i}') for i in range(2)
+        ]
+        old_post = Post.objects.create(text='Старый', author=self.author)
+        self.follow(self.follower, *others)
+        self.assertTrue(timeline.is_heavy(self.author))
+        post = Post.objects.create(text='Тяжёлый', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        # Test transactions never commit: run the callbacks right away.
+        with mock.patch.object(
+            timeline.transaction, 'on_commit', side_effect=lambda run: run()
+        ), mock.patch.object(
+            timeline, '_copy_missing', wraps=timeline._copy_missing
+        ) as copy:
+            self.unfollow(others[0])
+            # Back at the limit, but not at the resume mark yet.
+            self.assertTrue(timeline.is_heavy(self.author))
+            self.unfollow(others[1])
+            self.follow(others[1])
+            self.unfollow(others[1])
+
+        self.assertFalse(timeline.is_heavy(self.author))
+        self.assertEqual(copy.call_count, 1)
+        self.assertEqual(self.feed(), [post, old_post])
+        self.assertEqual(timeline._copy_missing(
+            self.author.pk, [self.follower.pk], [(post.pk, post.pub_date)]
+        ), 0)
@@ -1,13 +1,15 @@
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
 from django.test import Client, TestCase
 from django.shortcuts import get_object_or_404
 from django import forms
 
 from http import HTTPStatus
 
+from .. import feed_cache
 from ..models import User, Post, Group, Follow, POSTS_PER_PAGE
-from .utlis import URLS, TEMPLATES
+from .utlis import URLS, TEMPLATES, committed
 
 
 class PostsViewTest(TestCase):
@@ -193,18 +195,145 @@ class PostsViewTest(TestCase):
         )
         response = self.guest_client.get(URLS['index']())
         content = response.content
-        post.delete()
+        hits = feed_cache.stats()['hits']
         response_again = self.guest_client.get(URLS['index']())
-        content_again = response_again.content
 
-        # При повторном запросе получаем закешированную страницу с
-        # удалённым постом: контент совпадает.
-        self.assertEqual(content, content_again)
-        cache.clear()
+        # Пока посты не менялись, страница отдаётся из кеша.
+        self.assertEqual(content, response_again.content)
+        self.assertEqual(feed_cache.stats()['hits'], hits + 1)
+
+        # Удаление поста сбрасывает закешированную главную страницу.
+        post.delete()
         response_again = self.guest_client.get(URLS['index']())
-        content_again = response_again.content
-        # При очистке кеша получим отличную страницу: контент не совпадает.
-        self.assertNotEqual(content, content_again)
+        self.assertNotEqual(content, response_again.content)
+        self.assertNotIn(
+            post.text, response_again.content.decode()
+        )
+
+    def test_cache_invalidates_only_post_feeds(self):
+        index_feed = feed_cache.INDEX_FEED
+        group_feed = feed_cache.group_feed(PostsViewTest.group.slug)
+        other_feed = feed_cache.group_feed(PostsViewTest.another_group.slug)
+        before = {
+            feed: feed_cache._feed_version(feed)
+            for feed in (index_feed, group_feed, other_feed)
+        }
+        post = Post.objects.create(
+            text='Пост в первой группе',
+            author=PostsViewTest.user,
+            group=PostsViewTest.group,
+        )
+        self.assertNotEqual(
+            feed_cache._feed_version(index_feed), before[index_feed]
+        )
+        self.assertNotEqual(
+            feed_cache._feed_version(group_feed), before[group_feed]
+        )
+        self.assertEqual(
+            feed_cache._feed_version(other_feed), before[other_feed]
+        )
+
+        # Перенос поста в другую группу сбрасывает обе группы.
+        versions = {
+            feed: feed_cache._feed_version(feed)
+            for feed in (group_feed, other_feed)
+        }
+        post.group = PostsViewTest.another_group
+        post.save()
+        for feed, version in versions.items():
+            with self.subTest(feed=feed):
+                self.assertNotEqual(feed_cache._feed_version(feed), version)
+
+    def test_cache_dropped_again_after_commit(self):
+        url = URLS['index']()
+        with committed():
+            post = Post.objects.create(
+                text='Пост до коммита',
+                author=PostsViewTest.user,
+            )
+            # A reader that does not see the row yet fills the new version.
+            stale = Post.objects.filter(pk=post.pk)
+            stale.update(text='Старый текст', version=F('version') + 1)
+            self.assertContains(self.guest_client.get(url), 'Старый текст')
+            stale.update(text=post.text, version=F('version') + 1)
+        self.assertContains(self.guest_client.get(url), post.text)
+
+    def test_cache_group_and_profile_for_guests(self):
+        urls = (
+            URLS['group_list']({'slug': PostsViewTest.group.slug}),
+            URLS['profile']({'username': PostsViewTest.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.guest_client.get(url).content
+                hits = feed_cache.stats()['hits']
+                # Неизвестные параметры не создают новых записей кеша.
+                response = self.guest_client.get(url, {'utm': 'mail'})
+                self.assertEqual(response.content, content)
+                self.assertEqual(feed_cache.stats()['hits'], hits + 1)
+                self.assertNotEqual(
+                    self.guest_client.get(url, {'page': 2}).content, content
+                )
+
+        post = Post.objects.create(
+            text='Новый пост в группе',
+            author=PostsViewTest.user,
+            group=PostsViewTest.group,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), post.text)
+
+    def test_cache_bypassed_for_logged_in_users(self):
+        url = URLS['group_list']({'slug': PostsViewTest.group.slug})
+        self.guest_client.get(url)
+        stats = feed_cache.stats()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'изменить пост')
+        self.assertEqual(feed_cache.stats()['hits'], stats['hits'])
+        self.assertEqual(feed_cache.stats()['bypasses'], stats['bypasses'] + 1)
+
+    def test_cache_invalidated_by_group_and_author_edits(self):
+        group_url = URLS['group_list']({'slug': PostsViewTest.group.slug})
+        profile_url = URLS['profile'](
+            {'username': PostsViewTest.user.username}
+        )
+        self.guest_client.get(group_url)
+        self.guest_client.get(profile_url)
+
+        group = Group.objects.get(pk=PostsViewTest.group.pk)
+        group.description = 'Новое описание группы'
+        group.save()
+        self.assertContains(
+            self.guest_client.get(group_url), group.description
+        )
+
+        author = User.objects.get(pk=PostsViewTest.user.pk)
+        author.first_name, author.last_name = 'Новое', 'Имя'
+        author.save()
+        self.assertContains(self.guest_client.get(profile_url), 'Новое Имя')
+
+    def test_cache_dropped_under_old_slug_and_username(self):
+        group_url = URLS['group_list']({'slug': PostsViewTest.group.slug})
+        profile_url = URLS['profile'](
+            {'username': PostsViewTest.user.username}
+        )
+        self.guest_client.get(group_url)
+        self.guest_client.get(profile_url)
+
+        group = Group.objects.get(pk=PostsViewTest.group.pk)
+        group.slug = 'renamed-group'
+        group.save()
+        author = User.objects.get(pk=PostsViewTest.user.pk)
+        author.username = 'renamed'
+        author.save()
+
+        for url in (group_url, profile_url):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code,
+                    HTTPStatus.NOT_FOUND,
+                )
 
     def test_follow_unfollow(self):
         response = self.guest_client.get(URLS['follow_index']())
@@ -1,3 +1,8 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
 from django.urls import reverse
 
 
@@ -8,6 +13,20 @@ def reverser(viewname: str):
     return wrapper
 
 
+@contextmanager
+def committed(using: str = DEFAULT_DB_ALIAS):
+    """
+    Runs the on_commit callbacks registered in the block when it ends,
+    as the commit that a TestCase never reaches would.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        _, callback = connection.run_on_commit.pop(start)
+        callback()
+
+
 URLS = {
     'index': reverser('posts:index'),
     'group_list': reverser('posts:group_list'),
@@ -16,11 +35,23 @@ URLS = {
     'profile': reverser('posts:profile'),
     'post_edit': reverser('posts:post_edit'),
     'add_comment': reverser('posts:add_comment'),
+    'comments': reverser('posts:comments'),
     'follow_index': reverser('posts:follow_index'),
+    'search': reverser('posts:search'),
     'profile_follow': reverser('posts:profile_follow'),
     'profile_unfollow': reverser('posts:profile_unfollow'),
+    'metrics': reverser('posts:metrics'),
 }
 
+# Tests reset the metrics: keep them away from the real metrics file.
+metrics_in_memory = override_settings(CACHES={
+    **settings.CACHES,
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'metrics',
+    },
+})
+
 TEMPLATES = {
     'index': 'posts/index.html',
     'group_list': 'posts/group_list.html',
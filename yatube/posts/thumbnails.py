@@ -0,0 +1,205 @@
+"""
+Background generation of responsive post image variants.
+
+Saving a post with an image queues a worker that crops it to several
+widths, each as JPEG and WebP, so Pillow never runs on the request path
+of a page view. Until the variants are ready, templates render a
+placeholder; once they are, the post card and the feeds showing the post
+are dropped from the cache to pick up the image.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core import profiling
+from . import feed_cache, metrics
+from .models import Post
+
+WIDTHS = (320, 640, 960)
+ASPECT = 339 / 960
+FORMATS = {
+    'JPEG': ('jpg', {'quality': 85, 'progressive': True}),
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+}
+SIZES = '(min-width: 960px) 960px, 100vw'
+
+# 0 generates variants inline, after the transaction commits.
+WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+PENDING_TIMEOUT = 10 * 60
+
+logger = logging.getLogger(__name__)
+
+metrics.counter('thumbnails.processed', 'Images cropped to every variant.')
+metrics.counter('thumbnails.failed', 'Images whose variants failed.')
+metrics.gauge('thumbnails.backlog', 'Images waiting for their variants.')
+metrics.histogram(
+    'thumbnails.duration_seconds', 'Time to render the variants of an image.',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+_executor = None
+
+
+def _executor_instance() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=WORKERS, thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def _digest(image_name: str) -> str:
+    return hashlib.md5(image_name.encode()).hexdigest()
+
+
+def _key(image_name: str) -> str:
+    return f'thumbnail_variants:{_digest(image_name)}'
+
+
+def _variant_name(image_name: str, width: int, extension: str) -> str:
+    return f'thumbnails/{_digest(image_name)}/{width}.{extension}'
+
+
+def _describe(image_name: str) -> Dict[str, str]:
+    """``src``, ``srcset`` and ``webp_srcset`` of the variant files."""
+    srcsets = {
+        image_format: ', '.join(
+            f'{default_storage.url(_variant_name(image_name, width, ext))} '
+            f'{width}w'
+            for width in WIDTHS
+        )
+        for image_format, (ext, _) in FORMATS.items()
+    }
+    return {
+        'src': default_storage.url(
+            _variant_name(image_name, WIDTHS[-1], FORMATS['JPEG'][0])
+        ),
+        'srcset': srcsets['JPEG'],
+        'webp_srcset': srcsets['WEBP'],
+        'sizes': SIZES,
+    }
+
+
+def render_variants(image_name: str) -> Dict[str, str]:
+    """
+    Crops the stored image to every width and format and returns the
+    ``src``, ``srcset`` and ``webp_srcset`` for templates. Touches only
+    the file storage, so it is safe to run in another process.
+    """
+    with default_storage.open(image_name) as source:
+        image = Image.open(source)
+        # JPEG sources are decoded at a reduced scale when possible.
+        image.draft('RGB', (WIDTHS[-1], round(WIDTHS[-1] * ASPECT)))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for width in WIDTHS:
+        size = (width, round(width * ASPECT))
+        variant = ImageOps.fit(image, size, Image.LANCZOS)
+        for image_format, (extension, options) in FORMATS.items():
+            buffer = BytesIO()
+            variant.save(buffer, image_format, **options)
+            name = _variant_name(image_name, width, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    image.close()
+    return _describe(image_name)
+
+
+def stored_variants(image_name: str) -> Optional[Dict[str, str]]:
+    """
+    Variants already in the file storage, e.g. rendered by
+    ``generate_image_variants`` in another process, or None.
+    """
+    # Written last by `render_variants`.
+    last = _variant_name(image_name, WIDTHS[-1], FORMATS['WEBP'][0])
+    if not default_storage.exists(last):
+        return None
+    return _describe(image_name)
+
+
+def thumbnail_variants(image_name: str) -> Optional[Dict[str, str]]:
+    """Ready variants of the stored image for templates, or None."""
+    if not image_name:
+        return None
+    variants = cache.get(_key(image_name))
+    profiling.count('thumbnails.lookups')
+    if variants is None:
+        # The cache of this process may not have seen them yet.
+        variants = stored_variants(image_name)
+        if variants is not None:
+            cache.set(_key(image_name), variants, None)
+    if variants is None:
+        profiling.count('thumbnails.misses')
+    return variants
+
+
+def store(post_id: int, image_name: str, variants: Dict[str, str]) -> None:
+    """Publishes rendered variants and drops the pages that lack them."""
+    cache.set(_key(image_name), variants, None)
+    # The card of the post shows the variants: render it again.
+    Post.objects.filter(pk=post_id).update(
+        version=F('version') + 1, modified=timezone.now(),
+    )
+    feed_cache.invalidate(feed_cache.post_feeds(post_id))
+
+
+def stats() -> dict:
+    """Queue length and processing time of the thumbnail workers."""
+    values = metrics.values(
+        f'thumbnails.{name}' for name in ('backlog', 'processed', 'failed')
+    )
+    stats = {name.split('.', 1)[1]: value for name, value in values.items()}
+    _, seconds = metrics.histogram_values('thumbnails.duration_seconds')
+    stats['processing_ms'] = round(seconds * 1000)
+    return stats
+
+
+def generate(post_id: int, image_name: str) -> None:
+    """Renders the variants and refreshes the cached post pages."""
+    started = time.perf_counter()
+    try:
+        store(post_id, image_name, render_variants(image_name))
+        metrics.incr('thumbnails.processed')
+    except Exception:
+        logger.exception('Thumbnails of %s failed', image_name)
+        metrics.incr('thumbnails.failed')
+    finally:
+        cache.delete(f'{_key(image_name)}:pending')
+        metrics.incr('thumbnails.backlog', -1)
+        metrics.observe(
+            'thumbnails.duration_seconds', time.perf_counter() - started
+        )
+        if WORKERS:
+            close_old_connections()
+
+
+def enqueue(post: Post) -> None:
+    """Queues the variants of the post image unless they exist already."""
+    if not post.image or thumbnail_variants(post.image.name) is not None:
+        return
+    image_name = post.image.name
+    if not cache.add(f'{_key(image_name)}:pending', True, PENDING_TIMEOUT):
+        return
+    metrics.incr('thumbnails.backlog')
+
+    def submit():
+        if WORKERS:
+            _executor_instance().submit(generate, post.pk, image_name)
+        else:
+            generate(post.pk, image_name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,226 @@
+"""
+Materialized subscription feeds.
+
+Every follower gets a copy of a new post in their `TimelineEntry` inbox
+(fan-out-on-write), so reading ``/follow/`` is a range read on
+``(user, pub_date)``. Authors with more followers than
+``TIMELINE_FANOUT_LIMIT`` are not copied; their posts are merged into the
+feed of their followers at read time (fan-out-on-read) from the moment
+they pass the limit until they drop to ``TIMELINE_FANOUT_RESUME``, a
+little below it, so that follows and unfollows around the limit do not
+switch the author back and forth. Switching back runs in a background
+job that copies only the posts missing from the feeds.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.paginator import Page
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.http import HttpRequest
+from django.utils import timezone
+
+from .counters import author_counters
+from .models import (
+    FEED_FIELDS, AuthorCounters, Follow, Post, TimelineEntry, User
+)
+from .paginator import paginate
+
+FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+FANOUT_RESUME = getattr(
+    settings, 'TIMELINE_FANOUT_RESUME', FANOUT_LIMIT * 9 // 10
+)
+BACKFILL_LIMIT = getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 1000)
+# 0 resumes the fan-out inline, after the transaction commits.
+WORKERS = getattr(settings, 'TIMELINE_WORKERS', 1)
+BATCH_SIZE = 500
+# Followers whose feeds are compared with the author's posts at once.
+RESUME_CHUNK = 50
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _executor_instance() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=WORKERS, thread_name_prefix='timeline'
+        )
+    return _executor
+
+
+def is_heavy(author: User) -> bool:
+    return author_counters(author.pk).fanout_paused_at is not None
+
+
+def heavy_authors(user: User) -> list:
+    """Ids of authors followed by `user` who are served on read."""
+    return list(
+        User.objects.filter(
+            following__user=user,
+            counters__fanout_paused_at__isnull=False,
+        ).values_list('pk', flat=True)
+    )
+
+
+def fan_out(post: Post) -> None:
+    """Pushes a freshly published post into its author's followers."""
+    if post.author is None or is_heavy(post.author):
+        return
+    followers = Follow.objects.filter(
+        author=post.author
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user: User, author: User) -> None:
+    """Copies the latest posts of a newly followed author into the feed."""
+    if is_heavy(author):
+        return
+    posts = Post.objects.filter(author=author).values_list(
+        'pk', 'pub_date'
+    )[:BACKFILL_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user=user,
+                post_id=post_id,
+                author=author,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def pause_fan_out(author_id: int) -> None:
+    """Serves the author on read once they pass ``FANOUT_LIMIT``."""
+    AuthorCounters.objects.filter(
+        user_id=author_id,
+        fanout_paused_at=None,
+        followers_count__gt=FANOUT_LIMIT,
+    ).update(fanout_paused_at=timezone.now())
+
+
+def _resumable(author_id: int):
+    return AuthorCounters.objects.filter(
+        user_id=author_id,
+        fanout_paused_at__isnull=False,
+        followers_count__lte=FANOUT_RESUME,
+    )
+
+
+def schedule_resume(author_id: int) -> None:
+    """Queues `resume_fan_out` once the author drops to the resume mark."""
+    if not _resumable(author_id).exists():
+        return
+
+    def submit():
+        if WORKERS:
+            _executor_instance().submit(resume_fan_out, author_id)
+        else:
+            resume_fan_out(author_id)
+
+    transaction.on_commit(submit)
+
+
+def _copy_missing(author_id: int, user_ids: list, posts: list) -> int:
+    if not posts:
+        return 0
+    existing = set(TimelineEntry.objects.filter(
+        author_id=author_id,
+        user_id__in=user_ids,
+        pub_date__gte=posts[-1][1],
+    ).values_list('user_id', 'post_id'))
+    missing = [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, pub_date in posts
+        if (user_id, post_id) not in existing
+    ]
+    TimelineEntry.objects.bulk_create(
+        missing, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    return len(missing)
+
+
+def resume_fan_out(author_id: int) -> None:
+    """
+    Serves the author on write again and copies their latest posts that
+    the feeds of their followers miss: the posts published and the
+    follows made while the author was served on read.
+    """
+    try:
+        # Claims the job: a second one queued meanwhile finds nothing.
+        # New posts are pushed to the feeds from here on.
+        if not _resumable(author_id).update(fanout_paused_at=None):
+            return
+        posts = list(Post.objects.filter(author_id=author_id).order_by(
+            '-pub_date'
+        ).values_list('pk', 'pub_date')[:BACKFILL_LIMIT])
+        followers = list(Follow.objects.filter(
+            author_id=author_id
+        ).order_by('user_id').values_list('user_id', flat=True))
+        for start in range(0, len(followers), RESUME_CHUNK):
+            _copy_missing(
+                author_id, followers[start:start + RESUME_CHUNK], posts
+            )
+    except Exception:
+        logger.exception('Resuming the fan-out of %s failed', author_id)
+        # Back to reads, so no post goes missing; the next unfollow
+        # tries again.
+        AuthorCounters.objects.filter(
+            user_id=author_id, fanout_paused_at=None
+        ).update(fanout_paused_at=timezone.now())
+    finally:
+        if WORKERS:
+            close_old_connections()
+
+
+def prune(user: User, author: User) -> None:
+    """Drops an unfollowed author's posts from the feed."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def timeline_page(request: HttpRequest, user: User) -> Page:
+    """Returns the requested page of `user`'s subscription feed."""
+    heavy = heavy_authors(user)
+    if heavy:
+        posts = Post.objects.filter(
+            Q(pk__in=TimelineEntry.objects.filter(
+                user=user
+            ).values('post_id'))
+            | Q(author__in=heavy)
+        ).for_feed()
+        return paginate(request, posts)
+
+    entries = TimelineEntry.objects.filter(
+        user=user
+    ).select_related('post__author', 'post__group').only(
+        'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+    )
+    page_obj = paginate(request, entries, tiebreak='post_id')
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
+    return page_obj
@@ -0,0 +1,99 @@
+"""
+Size-bounded handling of uploaded post images.
+
+`LimitedUploadHandler` streams uploads to a temporary file and stops
+reading the request once a file goes over ``POST_IMAGE_MAX_SIZE``; the
+views then get an empty file marked as oversized in its place from
+`request_files`, for the form to report. `downscale` shrinks huge
+originals before they are saved, decoding JPEGs at a reduced scale so
+memory stays bounded.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    SimpleUploadedFile, TemporaryUploadedFile, UploadedFile
+)
+from django.core.files.uploadhandler import (
+    StopUpload, TemporaryFileUploadHandler
+)
+from django.http import HttpRequest
+from django.utils.datastructures import MultiValueDict
+from PIL import Image
+
+MAX_SIZE = getattr(settings, 'POST_IMAGE_MAX_SIZE', 10 * 1024 * 1024)
+MAX_PIXELS = getattr(settings, 'POST_IMAGE_MAX_PIXELS', 40_000_000)
+MAX_SIDE = getattr(settings, 'POST_IMAGE_MAX_SIDE', 2560)
+JPEG_QUALITY = 90
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Writes uploads to disk and stops the upload at the first chunk past
+    ``MAX_SIZE``: the rest of the request body is left unread, so the
+    fields sent after the file are lost too.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_SIZE:
+            oversized = SimpleUploadedFile(
+                self.file_name, b'', self.content_type
+            )
+            oversized.oversized = True
+            if not hasattr(self.request, 'oversized_uploads'):
+                self.request.oversized_uploads = MultiValueDict()
+            self.request.oversized_uploads.appendlist(
+                self.field_name, oversized
+            )
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def request_files(request: HttpRequest) -> MultiValueDict:
+    """`request.FILES` with the uploads stopped for their size put back."""
+    files = request.FILES
+    oversized = getattr(request, 'oversized_uploads', None)
+    if oversized:
+        files = files.copy()
+        for name, uploaded in oversized.lists():
+            files.setlist(name, uploaded)
+    return files
+
+
+def is_oversized(uploaded: UploadedFile) -> bool:
+    return getattr(uploaded, 'oversized', False)
+
+
+def downscale(uploaded: UploadedFile) -> UploadedFile:
+    """
+    Returns `uploaded` shrunk to fit ``MAX_SIDE``, or as is if it already
+    fits or is animated.
+    """
+    uploaded.seek(0)
+    with Image.open(uploaded) as image:
+        if max(image.size) <= MAX_SIDE or getattr(image, 'is_animated', 0):
+            uploaded.seek(0)
+            return uploaded
+        image_format = image.format
+        # For JPEG, thumbnail() decodes at 1/2..1/8 scale via draft().
+        image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': JPEG_QUALITY} if image_format == 'JPEG' else {}
+
+        if isinstance(uploaded, TemporaryUploadedFile):
+            # Rewritten in place rather than copied to a new temporary
+            # file: the request closes and deletes this one.
+            uploaded.seek(0)
+            uploaded.truncate()
+            image.save(uploaded, image_format, **options)
+            uploaded.size = uploaded.tell()
+            resized = uploaded
+        else:
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            resized = SimpleUploadedFile(
+                uploaded.name, buffer.getvalue(), uploaded.content_type
+            )
+    resized.seek(0)
+    return resized
@@ -43,14 +43,29 @@ urlpatterns = [
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='comments',
+    ),
     path(
         'posts/<int:post_id>/',
         views.post_detail,
         name='post_detail',
     ),
+    path(
+        'search/',
+        views.search,
+        name='search',
+    ),
     path(
         'follow/',
         views.follow_index,
         name='follow_index',
     ),
+    path(
+        'metrics',
+        views.prometheus_metrics,
+        name='metrics',
+    ),
 ]
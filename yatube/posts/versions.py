@@ -0,0 +1,65 @@
+"""
+Version numbers of cached objects, kept in the cache itself.
+
+A version is part of the cache keys built for an object, so bumping it
+drops every cached entry of the object at once. The time of the last
+bump is kept next to the version for ``Last-Modified`` headers.
+"""
+import time
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+
+
+def _key(name: str) -> str:
+    return f'version:{name}'
+
+
+def _modified_key(name: str) -> str:
+    return f'version_modified:{name}'
+
+
+def _fresh() -> int:
+    # A lost version must not resurrect entries cached under an old one.
+    return int(time.time() * 1000)
+
+
+def get_version(name: str) -> int:
+    return get_versions([name])[name]
+
+
+def get_versions(names: Iterable[str]) -> Dict[str, int]:
+    """Current versions of `names`, fetched in one cache round trip."""
+    names = list(names)
+    stored = cache.get_many([_key(name) for name in names])
+    versions = {}
+    for name in names:
+        version = stored.get(_key(name))
+        if version is None:
+            version = _fresh()
+            if cache.add(_key(name), version, None):
+                cache.add(_modified_key(name), time.time(), None)
+            else:
+                version = cache.get(_key(name), version)
+        versions[name] = version
+    return versions
+
+
+def bump(names: Iterable[str]) -> None:
+    names = set(names)
+    for name in names:
+        try:
+            cache.incr(_key(name))
+        except ValueError:
+            cache.set(_key(name), _fresh(), None)
+    now = time.time()
+    cache.set_many({_modified_key(name): now for name in names}, None)
+
+
+def last_modified(names: Iterable[str]) -> Optional[float]:
+    """Timestamp of the latest bump of `names`, None if it is unknown."""
+    names = list(names)
+    stored = cache.get_many([_modified_key(name) for name in names])
+    if not names or len(stored) < len(names):
+        return None
+    return max(stored.values())
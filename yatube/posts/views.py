@@ -1,38 +1,80 @@
-from django.core.paginator import Paginator
+from ipaddress import ip_address, ip_network
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Page
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
-from django.views.decorators.cache import cache_page
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
 
-from .models import Post, Group, User, Follow, POSTS_PER_PAGE
+from core.middleware import writes_to_primary
+from . import metrics, uploads
+from .models import FEED_FIELDS, Comment, Post, Group, User, Follow
+from .cards import PROFILE_CARD, render_cards
+from .conditional import (
+    Validators, conditional_page, group_page, post_page
+)
+from .counters import author_counters
+from .feed_cache import INDEX_FEED, cache_feed, group_feed, profile_feed
 from .forms import PostForm, CommentForm
+from .paginator import paginate
+from .search import search_posts
+from .timeline import timeline_page
 
-CACHE_TIMEOUT = 20 * 60
 PRETEXT_LENGTH = 30
+COMMENTS_PER_PAGE = getattr(settings, 'COMMENTS_PER_PAGE', 20)
+VIEWS = (
+    'index', 'group_list', 'profile', 'post_detail', 'comments',
+    'post_create', 'post_edit', 'add_comment', 'search', 'follow_index',
+    'profile_follow', 'profile_unfollow',
+)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_ALLOWED_NETWORKS = tuple(
+    ip_network(address.strip(), strict=False)
+    for address in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1',))
+    if address.strip()
+)
+
+metrics.histogram(
+    'views.duration_seconds', 'Time to answer requests to the posts pages.',
+    view=VIEWS,
+)
+
+
+def timed(view: str):
+    """Observes the response time of a view, under its URL name."""
+    return metrics.timed('views.duration_seconds', view=view)
 
 
-@cache_page(CACHE_TIMEOUT, key_prefix='index_page')
+@timed('index')
+@conditional_page(lambda: Validators([INDEX_FEED]))
+@cache_feed(lambda: INDEX_FEED)
 def index(request: HttpRequest) -> HttpResponse:
     """
     View for index page.
     """
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed()
+    page_obj = paginate(request, posts)
+    render_cards(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@timed('group_list')
+@conditional_page(group_page)
+@cache_feed(group_feed)
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     """
     View for group pages. Posts related to a specific group are here.
     """
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.filter(group=group).for_feed()
+    page_obj = paginate(request, posts, count=group.posts_count)
+    render_cards(page_obj)
     context = {
         'title': f'Записи сообщества {group.title}',
         'group': group,
@@ -41,20 +83,26 @@ def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     return render(request, 'posts/group_list.html', context)
 
 
+@timed('profile')
+@conditional_page(
+    lambda username: Validators([profile_feed(username)])
+)
+@cache_feed(profile_feed)
 def profile(request: HttpRequest, username: str) -> HttpResponse:
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
+    posts = Post.objects.filter(author=author).for_feed()
+    posts_count = author_counters(author.pk).posts_count
     is_follow_visible = (request.user.is_authenticated
                          and request.user != author)
     following = (is_follow_visible
                  and Follow.objects.filter(user=request.user,
                                            author=author).exists())
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_obj = paginator.get_page(request.GET.get('page'), )
+    page_obj = paginate(request, posts, count=posts_count)
+    render_cards(page_obj, PROFILE_CARD)
     context = {
         'author': author,
         'full_name': f'{author.first_name} {author.last_name}',
-        'posts_count': posts.count(),
+        'posts_count': posts_count,
         'page_obj': page_obj,
         'following': following,
         'is_follow_visible': is_follow_visible,
@@ -62,26 +110,65 @@ def profile(request: HttpRequest, username: str) -> HttpResponse:
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(request: HttpRequest, post: Post) -> Page:
+    """
+    A page of the post comments, newest first, read by cursor. The total
+    is the maintained ``comments_count`` of the post.
+    """
+    comments = Comment.objects.filter(post_id=post.pk).select_related(
+        'author'
+    ).only('text', 'pub_date', 'post', 'author', 'author__username')
+    return paginate(
+        request, comments, COMMENTS_PER_PAGE, count=post.comments_count
+    )
+
+
+@timed('post_detail')
+@conditional_page(post_page)
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(
-        author=post.author
-    ).count()
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__counters').only(
+            *FEED_FIELDS, 'comments_count', 'author__counters__posts_count',
+        ),
+        pk=post_id,
+    )
+    # Joined: the validators already spent a query on the post row.
+    counters = getattr(post.author, 'counters', None)
+    posts_count = counters.posts_count if counters else 0
     context = {
         'pretext': post.text[:PRETEXT_LENGTH],
         'post': post,
         'posts_count': posts_count,
         'form': CommentForm(request.POST or None),
-        'comments': post.comments.all(),
+        'comments': comments_page(request, post),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@timed('comments')
+@conditional_page(post_page)
+def post_comments(request: HttpRequest, post_id: int) -> HttpResponse:
+    """
+    Further pages of the comments of a post, loaded as the reader
+    scrolls: the rendered comments and the cursor of the next page.
+    """
+    post = get_object_or_404(Post.objects.only('comments_count'), pk=post_id)
+    comments = comments_page(request, post)
+    return JsonResponse({
+        'html': render_to_string(
+            'includes/comment_list.html', {'comments': comments}, request
+        ),
+        'cursor': comments.paginator.next_cursor,
+        'count': post.comments_count,
+    })
+
+
+@timed('post_create')
 @login_required
 def post_create(request: HttpRequest) -> HttpResponse:
     post_form = PostForm(
         request.POST or None,
-        files=request.FILES or None,
+        files=uploads.request_files(request) or None,
     )
     context = {
         'title': 'Добавить запись',
@@ -99,6 +186,7 @@ def post_create(request: HttpRequest) -> HttpResponse:
     return redirect('posts:profile', request.user.username)
 
 
+@timed('post_edit')
 @login_required
 def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     post = get_object_or_404(Post, pk=post_id)
@@ -107,7 +195,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
 
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None,
+        files=uploads.request_files(request) or None,
         instance=post
     )
     context = {
@@ -123,6 +211,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     return redirect('posts:post_detail', post_id)
 
 
+@timed('add_comment')
 @login_required
 def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     post = get_object_or_404(Post, pk=post_id)
@@ -136,14 +225,33 @@ def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@timed('search')
+def search(request: HttpRequest) -> HttpResponse:
+    """
+    View for search results: posts matching the query in their text
+    or in their comments, newest first.
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate(request, search_posts(query).for_feed())
+    render_cards(page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': f'{urlencode({"q": query})}&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@timed('follow_index')
 @login_required
 def follow_index(request: HttpRequest) -> HttpResponse:
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj = timeline_page(request, request.user)
+    render_cards(page_obj)
     return render(request, 'posts/follow.html', {'page_obj': page_obj})
 
 
+@timed('profile_follow')
+@writes_to_primary
 @login_required
 def profile_follow(request, username: str) -> HttpResponse:
     author = get_object_or_404(User, username=username)
@@ -155,9 +263,32 @@ def profile_follow(request, username: str) -> HttpResponse:
     return redirect('posts:profile', username=username)
 
 
+@timed('profile_unfollow')
+@writes_to_primary
 @login_required
 def profile_unfollow(request, username: str) -> HttpResponse:
     author = get_object_or_404(User, username=username)
     if request.user != author:
         Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+def is_internal(request: HttpRequest) -> bool:
+    """Whether the request comes from ``METRICS_ALLOWED_IPS``."""
+    try:
+        address = ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_NETWORKS)
+
+
+def prometheus_metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Counters and histograms of all workers for Prometheus, shown to
+    staff and to internal addresses only.
+    """
+    if not (request.user.is_staff or is_internal(request)):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.exposition(), content_type=METRICS_CONTENT_TYPE
+    )
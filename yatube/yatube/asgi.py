@@ -0,0 +1,15 @@
+"""
+ASGI entry point, e.g. ``uvicorn yatube.asgi:application``.
+"""
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(
+    get_wsgi_application(), threads=settings.ASGI_THREADS
+)
@@ -32,14 +32,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'posts',
-    'core',
+    'posts.apps.PostsConfig',
+    'core.apps.CoreConfig',
     'about',
+    'api',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +76,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Threads that run views under yatube.asgi; the event loop handles I/O.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
 
 DATABASES = {
     'default': {
@@ -80,10 +86,97 @@ DATABASES = {
     }
 }
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Read replicas of the default database, e.g. two local SQLite copies:
+# DATABASE_REPLICA_FILES=/srv/replica1.sqlite3,/srv/replica2.sqlite3
+# Read-only requests are served from them, everything else from default.
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(',')),
+    start=1,
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+
+# SQLITE_PRODUCTION=1 keeps connections open between requests and tunes
+# every new SQLite connection: WAL lets readers work during a write.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION', default='') == '1'
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+if SQLITE_PRODUCTION:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 600
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# How long a user reads from the primary after writing something.
+REPLICA_PIN_SECONDS = 10
+
+# CACHE_BACKEND=shared keeps the cache in a SQLite file used by every
+# worker process of the host; locmem gives each process its own cache.
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_SIZE': int(os.getenv('CACHE_MAX_SIZE', 64 * 1024 * 1024)),
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', default='locmem')],
+    # Metrics add up over every worker of the host and are never evicted,
+    # whatever CACHE_BACKEND is.
+    'metrics': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'METRICS_LOCATION',
+            default=os.path.join(BASE_DIR, 'metrics.sqlite3'),
+        ),
+        'OPTIONS': {'MAX_SIZE': None},
+    },
+}
+METRICS_CACHE = 'metrics'
+# Who may read /metrics besides staff: addresses or networks, comma
+# separated. Behind a proxy, REMOTE_ADDR is the address of the proxy.
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1,::1'
+).split(',')
+
+# Share of requests profiled by core.middleware.ProfilingMiddleware.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+
+# Slow and N+1 query detection of core.middleware.QueryInspectionMiddleware:
+# 'off', 'log' (development, staging) or 'raise' (tests).
+QUERY_INSPECTION = os.getenv('QUERY_INSPECTION', default='off')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', default=100))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', default=5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {'handlers': ['console'], 'level': 'INFO'},
+        'core.queries': {'handlers': ['console'], 'level': 'WARNING'},
+    },
 }
 
 LOGIN_URL = 'users:login'
@@ -124,3 +217,11 @@ STATICFILES_DIRS = (
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Uploads are streamed to disk and cut off past POST_IMAGE_MAX_SIZE.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+]
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
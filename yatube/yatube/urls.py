@@ -28,6 +28,10 @@ urlpatterns = [
         'about/',
         include('about.urls', namespace='about')
     ),
+    path(
+        'api/v1/',
+        include('api.urls', namespace='api')
+    ),
 ]
 
 if settings.DEBUG: